@@ -0,0 +1,42 @@
+"""
+File chạy pipeline hàng loạt cho cả thư mục PDF (hoặc file manifest)
+"""
+import argparse
+import sys
+from src.utils import setup_logging, load_config
+from src.batch_processor import BatchProcessor
+
+logger = setup_logging()
+
+def main():
+    """Hàm chính chạy pipeline cho nhiều sách"""
+    parser = argparse.ArgumentParser(description="Chuẩn hóa văn bản hàng loạt từ nhiều file PDF")
+    parser.add_argument('input', help="Thư mục chứa PDF hoặc file manifest (mỗi dòng một đường dẫn)")
+    parser.add_argument('--output', help="Thư mục kết quả (mặc định: batch.output_dir)")
+    parser.add_argument('--workers', type=int, help="Số sách xử lý song song (mặc định: batch.workers)")
+    parser.add_argument('--config', default='config/config.yaml', help="File cấu hình")
+    args = parser.parse_args()
+    
+    try:
+        config = load_config(args.config)
+        batch_config = config.get('batch', {})
+        processor = BatchProcessor(
+            config,
+            output_dir=args.output or batch_config.get('output_dir', 'output/batch'),
+            workers=args.workers or batch_config.get('workers')
+        )
+        
+        pdf_paths = processor.discover(args.input)
+        if not pdf_paths:
+            logger.error(f"✗ Không tìm thấy file PDF trong: {args.input}")
+            return 1
+        
+        report = processor.run(pdf_paths)
+        return 0 if report['failed'] == 0 else 1
+        
+    except Exception as e:
+        logger.error(f"❌ LỖI: {str(e)}", exc_info=True)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
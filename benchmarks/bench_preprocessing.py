@@ -0,0 +1,86 @@
+"""
+Benchmark đánh đổi tốc độ/chất lượng của bước tiền xử lý ảnh trước OCR
+(cần Tesseract). So sánh OCR ảnh gốc với OCR ảnh đã tiền xử lý trên
+một số trang mẫu.
+
+Ví dụ:
+    python benchmarks/bench_preprocessing.py --pages 5 10 20
+"""
+import argparse
+import difflib
+import logging
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from PIL import Image
+from src.utils import load_config
+from src.ocr_backends import get_backend
+from src.image_preprocessing import ImagePreprocessor
+
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'config', 'config.yaml')
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh OCR có/không tiền xử lý ảnh")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="File cấu hình")
+    parser.add_argument('--images', help="Thư mục ảnh trang (mặc định: paths.output_images)")
+    parser.add_argument('--pages', type=int, nargs='+', default=[5, 10, 20], help="Các trang cần đo")
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    config = load_config(args.config)
+    ocr_config = config['ocr']
+    pre_config = config.get('preprocessing', {})
+    image_dir = args.images or os.path.join(ROOT_DIR, config['paths']['output_images'])
+    
+    engine = get_backend(ocr_config.get('backend', 'pytesseract'),
+                         ocr_config['language'], ocr_config['tesseract_config'])
+    preprocessor = ImagePreprocessor(
+        mode=pre_config.get('mode', 'binary'),
+        crop_margins=pre_config.get('crop_margins', True),
+        margin=pre_config.get('margin', 20),
+        target_line_height=pre_config.get('target_line_height', 40),
+        source_dpi=ocr_config['dpi'],
+        min_dpi=pre_config.get('min_dpi', 150)
+    )
+    
+    total_raw = total_pre = total_prep = 0.0
+    print(f"{'trang':>6} {'gốc (s)':>9} {'tiền xử lý (s)':>15} {'OCR (s)':>8} {'DPI':>5} {'giống (%)':>10}")
+    for page in args.pages:
+        path = os.path.join(image_dir, f"page_{page}.png")
+        if not os.path.exists(path):
+            print(f"{page:>6} không có ảnh {path}")
+            continue
+        with Image.open(path) as img:
+            img.load()
+            
+            start = time.perf_counter()
+            raw_text, _ = engine.recognize_image(img.copy())
+            raw_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            processed, info = preprocessor.process(img)
+            prep_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            pre_text, _ = engine.recognize_image(processed)
+            pre_seconds = time.perf_counter() - start
+        
+        # Độ giống nhau giữa hai kết quả (không có ground truth thì dùng làm thước đo tương đối)
+        similarity = difflib.SequenceMatcher(None, raw_text, pre_text, autojunk=False).ratio()
+        total_raw += raw_seconds
+        total_pre += pre_seconds
+        total_prep += prep_seconds
+        print(f"{page:>6} {raw_seconds:>9.2f} {prep_seconds:>15.2f} {pre_seconds:>8.2f} "
+              f"{info['dpi']:>5} {similarity * 100:>10.1f}")
+    
+    if total_raw > 0:
+        print(f"\nTổng: gốc {total_raw:.2f}s, tiền xử lý + OCR {total_prep + total_pre:.2f}s "
+              f"({(total_prep + total_pre) / total_raw:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
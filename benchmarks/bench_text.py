@@ -0,0 +1,193 @@
+"""
+Benchmark tốc độ làm sạch và phân đoạn văn bản (không cần Tesseract/Poppler)
+
+Ví dụ:
+    python benchmarks/bench_text.py --sizes 1 10 100
+    python benchmarks/bench_text.py --sizes 1 10 --save-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.utils import load_config
+from src.text_cleaner import TextCleaner
+from src.text_segmenter import TextSegmenter
+
+DEFAULT_SOURCE = os.path.join(ROOT_DIR, 'output', 'raw_text.txt')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baseline.json')
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, 'config', 'config.yaml')
+
+# Dùng khi không có raw_text.txt: sinh văn bản tiếng Việt giả lập
+WORDS = (
+    "người nhà nước Việt Nam được không những trong một các có là của và với "
+    "đã sẽ đang cho đến từ khi thì mà này đó năm tháng ngày quyển sách chương "
+    "lịch sử văn hóa dân tộc chiến tranh hòa bình thế giới xã hội kinh tế"
+).split()
+
+def synthetic_text(size_mb, source=DEFAULT_SOURCE, seed=2024):
+    """
+    Tạo văn bản có dung lượng xấp xỉ size_mb (UTF-8) bằng cách lặp lại
+    raw_text.txt, hoặc sinh ngẫu nhiên (cố định seed) nếu không có file
+    
+    Args:
+        size_mb (float): Dung lượng cần tạo (MB)
+        source (str): File văn bản mẫu
+        seed (int): Seed cho bộ sinh ngẫu nhiên
+        
+    Returns:
+        str: Văn bản benchmark
+    """
+    target = int(size_mb * 1024 * 1024)
+    if os.path.exists(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            sample = f.read()
+    else:
+        rng = random.Random(seed)
+        lines = []
+        for i in range(2000):
+            words = rng.choices(WORDS, k=rng.randint(5, 20))
+            lines.append(' '.join(words).capitalize() + rng.choice(['.', '!', '?', ',']))
+            if i % 7 == 6:
+                lines.append('')
+            if i % 40 == 39:
+                lines.append(str(i // 40 + 1))  # số trang
+        sample = '\n'.join(lines) + '\n'
+    
+    sample_bytes = len(sample.encode('utf-8'))
+    repeat = max(1, -(-target // sample_bytes))
+    return sample * repeat
+
+
+def measure(func, text, track_memory):
+    """
+    Chạy một hàm benchmark và đo thời gian, bộ nhớ đỉnh
+    
+    Args:
+        func (callable): Hàm nhận văn bản
+        text (str): Văn bản đầu vào
+        track_memory (bool): Đo bộ nhớ đỉnh bằng tracemalloc (chạy thêm một lần)
+        
+    Returns:
+        dict: Số liệu đo
+    """
+    size_mb = len(text.encode('utf-8')) / 1024 / 1024
+    
+    start = time.perf_counter()
+    func(text)
+    seconds = time.perf_counter() - start
+    
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        func(text)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    
+    return {
+        'size_mb': round(size_mb, 2),
+        'seconds': round(seconds, 4),
+        'mb_per_s': round(size_mb / seconds, 3) if seconds > 0 else None,
+        'peak_mb': round(peak_mb, 1) if peak_mb is not None else None
+    }
+
+
+def build_benchmarks(config):
+    """Danh sách (tên, hàm) cần đo"""
+    cleaner = TextCleaner(config)
+    min_length = config['segmentation']['min_sentence_length']
+    sentence = TextSegmenter(method='sentence', min_length=min_length)
+    paragraph = TextSegmenter(method='paragraph', min_length=min_length)
+    return [
+        ('clean', cleaner.clean),
+        ('segment_sentence', sentence.segment),
+        ('segment_paragraph', paragraph.segment),
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """
+    So sánh với baseline, trả về danh sách các benchmark bị chậm đi
+    
+    Args:
+        results (dict): Kết quả hiện tại
+        baseline (dict): Kết quả baseline
+        tolerance (float): Mức chậm cho phép (0.2 = 20%)
+        
+    Returns:
+        list: Các dòng mô tả regression
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base or not base.get('mb_per_s') or not current.get('mb_per_s'):
+            continue
+        ratio = current['mb_per_s'] / base['mb_per_s']
+        status = 'OK'
+        if ratio < 1 - tolerance:
+            status = 'CHẬM HƠN'
+            regressions.append(key)
+        print(f"  {key:<32} {base['mb_per_s']:>9.2f} -> {current['mb_per_s']:>9.2f} MB/s "
+              f"({ratio:.0%}) {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TextCleaner và TextSegmenter")
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 10],
+                        help="Dung lượng văn bản cần đo (MB), ví dụ: 1 10 100 500")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="File văn bản mẫu để nhân bản")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="File cấu hình")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="File baseline (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="Ghi kết quả làm baseline mới")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Mức chậm cho phép so với baseline")
+    parser.add_argument('--no-memory', action='store_true', help="Không đo bộ nhớ đỉnh (nhanh hơn)")
+    args = parser.parse_args()
+    
+    # Tắt log INFO của các module để không ảnh hưởng số đo
+    logging.disable(logging.INFO)
+    
+    config = load_config(args.config)
+    benchmarks = build_benchmarks(config)
+    
+    results = {}
+    for size in args.sizes:
+        text = synthetic_text(size, args.source)
+        for name, func in benchmarks:
+            key = f"{name}@{size:g}MB"
+            results[key] = measure(func, text, track_memory=not args.no_memory)
+            r = results[key]
+            peak = f"{r['peak_mb']:>8.1f} MB" if r['peak_mb'] is not None else "       -"
+            print(f"{key:<32} {r['seconds']:>8.3f} giây {r['mb_per_s']:>9.2f} MB/s  đỉnh {peak}")
+        del text
+    
+    exit_code = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\nSo sánh với baseline:")
+        if compare(results, baseline, args.tolerance):
+            exit_code = 1
+    
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nĐã lưu baseline: {args.baseline}")
+    
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Kiểm tra chế độ song song cho kết quả giống hệt chế độ tuần tự (từng byte):
+văn bản sạch của ParallelTextProcessor.clean so với TextCleaner.clean, của
+ParallelTextProcessor.clean_pages (cả vị trí đầu trang) so với TextCleaner.clean_pages,
+vị trí các đoạn của ParallelTextProcessor.iter_spans so với TextSegmenter.iter_spans
+
+Ví dụ:
+    python benchmarks/check_parallel_text.py
+    python benchmarks/check_parallel_text.py --sizes 1 10 --workers 8
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.utils import load_config
+from src.text_cleaner import TextCleaner
+from src.text_segmenter import TextSegmenter
+from src.parallel_text import ParallelTextProcessor
+from benchmarks.bench_text import DEFAULT_CONFIG, DEFAULT_SOURCE, synthetic_text
+
+# Các dòng dễ gây lệch khi cắt khối: dòng trống/chỉ có khoảng trắng, dòng bị loại
+# theo pattern header/footer, số thứ tự đầu dòng, viết tắt, dấu câu trước dòng trống
+TRICKY_LINES = [
+    '', '', '   ', '\t', ' \t ', '12', 'Trang 7', '\x0c', '﻿',
+    '1. Mở đầu', '  2. Nội dung', 'TP. Hồ Chí Minh, ngày 1.', 'GS. Nguyễn V. A. nói:',
+    'Hết chương… tiếp theo', 'v.v. Sau đó', 'Xem http://example.com và www.test.vn nhé.',
+    'Cái  gì   thế?', 'uới nhau lrong nhà.', '“Thật không?” anh hỏi.', 'Ngườí ta.',
+]
+
+def tricky_text(num_lines, seed=7):
+    """Văn bản trộn ngẫu nhiên các dòng khó và các dòng văn bản thường"""
+    rng = random.Random(seed)
+    words = "người nhà nước Việt Nam được không những trong một các có là của".split()
+    lines = []
+    for _ in range(num_lines):
+        if rng.random() < 0.4:
+            lines.append(rng.choice(TRICKY_LINES))
+        else:
+            lines.append(' '.join(rng.choices(words, k=rng.randint(1, 15)))
+                         + rng.choice(['.', '', '!', ' ;', '...']))
+    return rng.choice(['', '\n', '\n\n  ']) + '\n'.join(lines) + rng.choice(['', '\n', '\n\n \n'])
+
+def tricky_pages(text, seed=7):
+    """Chia văn bản thành các trang ngẫu nhiên, có cả trang rỗng và trang chỉ có khoảng trắng"""
+    rng = random.Random(seed)
+    lines = text.split('\n')
+    records = []
+    start = 0
+    while start < len(lines):
+        end = start + rng.randint(0, 30)
+        records.append({'page': len(records) + 1, 'text': '\n'.join(lines[start:end])})
+        start = end
+    return records
+
+def check_pages(name, records, config, chunk_sizes, workers):
+    """
+    So sánh làm sạch theo trang song song với tuần tự (văn bản và vị trí đầu trang)
+
+    Returns:
+        bool: True nếu mọi kết quả đều giống hệt
+    """
+    ok = True
+    cleaner = TextCleaner(config)
+    expected = ''.join(cleaner.clean_pages(records))
+    for chunk_size in chunk_sizes:
+        processor = ParallelTextProcessor(config, workers=workers, chunk_size=chunk_size)
+        parallel_cleaner = TextCleaner(config)
+        actual = processor.clean_pages(records, parallel_cleaner)
+        same = (actual.encode('utf-8') == expected.encode('utf-8')
+                and parallel_cleaner.page_offsets == cleaner.page_offsets
+                and parallel_cleaner.pattern_counts == cleaner.pattern_counts)
+        print(f"  [{name}] clean_pages, khối {chunk_size}: {'OK' if same else 'KHÁC'} "
+              f"({len(records)} trang)")
+        ok &= same
+    return ok
+
+def check_text(name, text, config, chunk_sizes, workers):
+    """
+    So sánh kết quả song song với tuần tự trên một văn bản
+
+    Returns:
+        bool: True nếu mọi kết quả đều giống hệt
+    """
+    ok = True
+    cleaner = TextCleaner(config)
+    start = time.perf_counter()
+    expected = cleaner.clean(text)
+    serial_seconds = time.perf_counter() - start
+    streamed = ''.join(TextCleaner(config).clean_stream([text]))
+    if streamed != expected:
+        print(f"  [{name}] clean_stream khác clean (lỗi có sẵn, không do chế độ song song)")
+
+    segmenters = {
+        method: TextSegmenter(method=method,
+                              min_length=config['segmentation']['min_sentence_length'],
+                              abbreviations=config['segmentation'].get('abbreviations'))
+        for method in ('sentence', 'paragraph')
+    }
+    expected_spans = {method: list(s.iter_spans(expected)) for method, s in segmenters.items()}
+
+    for chunk_size in chunk_sizes:
+        processor = ParallelTextProcessor(config, workers=workers, chunk_size=chunk_size)
+        parallel_cleaner = TextCleaner(config)
+        start = time.perf_counter()
+        actual = processor.clean(text, parallel_cleaner)
+        parallel_seconds = time.perf_counter() - start
+        same = actual.encode('utf-8') == expected.encode('utf-8')
+        same_counts = parallel_cleaner.pattern_counts == cleaner.pattern_counts
+        print(f"  [{name}] clean, khối {chunk_size}: {'OK' if same and same_counts else 'KHÁC'} "
+              f"({serial_seconds:.3f}s tuần tự, {parallel_seconds:.3f}s song song)")
+        ok &= same and same_counts
+
+        for method, segmenter in segmenters.items():
+            config['segmentation']['method'] = method
+            spans = list(ParallelTextProcessor(config, workers=workers, chunk_size=chunk_size)
+                         .iter_spans(expected, segmenter))
+            same = spans == expected_spans[method]
+            print(f"  [{name}] {method}, khối {chunk_size}: {'OK' if same else 'KHÁC'} "
+                  f"({len(spans)} đoạn)")
+            ok &= same
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra chế độ song song giống hệt tuần tự")
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1],
+                        help="Dung lượng văn bản giả lập (MB)")
+    parser.add_argument('--workers', type=int, default=4, help="Số tiến trình")
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="File cấu hình")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="File văn bản mẫu để nhân bản")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    config = load_config(args.config)
+    method = config['segmentation']['method']
+
+    ok = True
+    for seed in range(20):
+        text = tricky_text(400, seed)
+        ok &= check_text(f"khó #{seed}", text, config, [50, 300, 2000], args.workers)
+        ok &= check_pages(f"khó #{seed}", tricky_pages(text, seed), config, [50, 300, 2000],
+                          args.workers)
+    for size in args.sizes:
+        text = synthetic_text(size, args.source)
+        ok &= check_text(f"{size:g}MB", text, config, [64 * 1024, 1024 * 1024], args.workers)
+    config['segmentation']['method'] = method
+
+    print("\nKết quả: " + ("giống hệt chế độ tuần tự" if ok else "CÓ KHÁC BIỆT"))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
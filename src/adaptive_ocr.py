@@ -0,0 +1,129 @@
+"""
+Module OCR hai tầng: mọi trang được OCR nhanh ở DPI thấp, chỉ các trang có độ tin cậy
+thấp mới được render lại ở DPI cao và OCR lại (có thể với các chế độ --psm khác)
+"""
+from src.utils import setup_logging
+from src.fused_pipeline import FusedPDFOCRPipeline
+
+logger = setup_logging()
+
+# Nguồn kết quả của lượt OCR nhanh được xét nâng cấp (trang trắng, lớp văn bản thì không);
+# trang lỗi ở lượt nhanh luôn được OCR lại ở DPI cao
+_RETRY_SOURCES = ('ocr', 'cache', 'checkpoint', 'error')
+
+class AdaptiveOCR:
+    def __init__(self, converter, extractors, min_confidence=75, queue_size=4):
+        """
+        Khởi tạo bộ nâng cấp OCR
+
+        Args:
+            converter (PDFToImageConverter): Bộ render ở DPI cao
+            extractors (list): Các OCRExtractor ở DPI cao, thử lần lượt (mỗi cái một
+                               cấu hình Tesseract) đến khi đạt ngưỡng độ tin cậy
+            min_confidence (float): Trang có độ tin cậy thấp hơn ngưỡng (0-100) được OCR lại
+            queue_size (int): Số trang tối đa chờ OCR trong hàng đợi
+        """
+        self.converter = converter
+        self.extractors = extractors
+        self.min_confidence = min_confidence
+        self.queue_size = queue_size
+        self.num_pages = 0
+        self.escalated = []
+        self.improved = set()
+        self.fast_seconds = 0.0
+        self.retry_seconds = 0.0
+        self.high_seconds = []
+
+    def needs_retry(self, record):
+        """Trang OCR lỗi hoặc có độ tin cậy thấp (hoặc không nhận được từ nào) ở lượt nhanh"""
+        if record['source'] not in _RETRY_SOURCES:
+            return False
+        if record['source'] == 'error':
+            return True
+        confidence = record.get('confidence')
+        return confidence is None or confidence < self.min_confidence
+
+    def refine(self, pdf_path, records):
+        """
+        OCR lại ở DPI cao các trang có độ tin cậy thấp, giữ kết quả tốt nhất của mỗi trang
+
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            records (list): Bản ghi các trang sau lượt OCR nhanh
+
+        Returns:
+            list: Bản ghi các trang theo thứ tự, đã thay bằng kết quả tốt hơn
+
+        Raises:
+            RuntimeError: Mọi trang của lượt OCR nhanh đều lỗi (lỗi cấu hình/engine,
+                          OCR lại từng trang ở DPI cao cũng sẽ lỗi)
+        """
+        by_page = {record['page']: record for record in records}
+        self.fast_seconds = sum(r['seconds'] or 0.0 for r in records)
+        self.num_pages = sum(1 for r in records if r['source'] in _RETRY_SOURCES)
+        failed = sum(1 for r in records if r['source'] == 'error')
+        if failed and failed == self.num_pages:
+            raise RuntimeError(f"OCR hai tầng: lượt OCR nhanh lỗi ở cả {failed} trang, "
+                               f"kiểm tra cấu hình Tesseract (xem lỗi từng trang trong log)")
+        self.escalated = [r['page'] for r in records if self.needs_retry(r)]
+        if not self.escalated:
+            return records
+
+        logger.info(f"Nâng cấp OCR: {len(self.escalated)}/{self.num_pages} trang lỗi hoặc có "
+                    f"độ tin cậy dưới {self.min_confidence} ({failed} trang lỗi), "
+                    f"OCR lại ở {self.converter.dpi} DPI")
+        pending = list(self.escalated)
+        for attempt, extractor in enumerate(self.extractors):
+            if not pending:
+                break
+            logger.info(f"  Lượt {attempt + 1} ({extractor.config}): {len(pending)} trang")
+            pipeline = FusedPDFOCRPipeline(self.converter, extractor, queue_size=self.queue_size)
+            still_low = []
+            for record in pipeline.run_pages(pdf_path, pending):
+                seconds = record['seconds'] or 0.0
+                self.retry_seconds += seconds
+                if attempt == 0 and record['source'] == 'ocr':
+                    self.high_seconds.append(seconds)
+
+                previous = by_page[record['page']]
+                if record['source'] != 'error' and self._better(record, previous):
+                    by_page[record['page']] = dict(record, layout=previous.get('layout'))
+                    self.improved.add(record['page'])
+                if self.needs_retry(by_page[record['page']]):
+                    still_low.append(record['page'])
+            pending = still_low
+        still_failed = [page for page, record in sorted(by_page.items())
+                        if record['source'] == 'error']
+        if still_failed:
+            logger.warning(f"⚠️  OCR hai tầng: {len(still_failed)} trang vẫn lỗi sau khi OCR lại: "
+                           f"{still_failed[:20]}")
+        return [by_page[page] for page in sorted(by_page)]
+
+    @staticmethod
+    def _better(record, other):
+        """record có độ tin cậy cao hơn other (không có độ tin cậy coi như thấp nhất,
+        mọi kết quả đều tốt hơn trang lỗi)"""
+        if other['source'] == 'error':
+            return True
+        confidence = record.get('confidence')
+        other_confidence = other.get('confidence')
+        if confidence is None:
+            return False
+        return other_confidence is None or confidence > other_confidence
+
+    def log_stats(self):
+        """Thống kê tỷ lệ nâng cấp và thời gian tiết kiệm so với OCR toàn bộ ở DPI cao"""
+        num_pages = self.num_pages
+        if not num_pages:
+            return
+        rate = len(self.escalated) / num_pages
+        logger.info(f"OCR hai tầng: nâng cấp {len(self.escalated)}/{num_pages} trang ({rate:.1%}), "
+                    f"{len(self.improved)} trang có kết quả tốt hơn")
+        total = self.fast_seconds + self.retry_seconds
+        logger.info(f"  Thời gian OCR: {self.fast_seconds:.1f}s lượt nhanh + "
+                    f"{self.retry_seconds:.1f}s nâng cấp = {total:.1f}s")
+        # Ước tính từ thời gian trung bình một trang ở DPI cao của các trang vừa nâng cấp
+        estimate = sum(self.high_seconds) / len(self.high_seconds) * num_pages if self.high_seconds else 0
+        if estimate > 0:
+            logger.info(f"  Ước tính OCR toàn bộ ở {self.converter.dpi} DPI: {estimate:.1f}s, "
+                        f"tiết kiệm {estimate - total:.1f}s ({1 - total / estimate:.0%})")
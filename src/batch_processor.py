@@ -0,0 +1,229 @@
+"""
+Module xử lý hàng loạt: chạy pipeline cho cả thư mục PDF song song
+"""
+import copy
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.utils import setup_logging, create_directories
+from src.pipeline import run_pipeline, segment_output_format
+
+logger = setup_logging()
+
+def _process_book(name, book_config):
+    """
+    Hàm chạy trong tiến trình con: xử lý một cuốn sách
+    
+    Args:
+        name (str): Tên sách (tên file PDF không có đuôi)
+        book_config (dict): Cấu hình riêng của cuốn sách
+        
+    Returns:
+        dict: Kết quả gồm trạng thái, thời gian và lỗi (nếu có)
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        create_directories(book_config)
+        status = 'ok' if run_pipeline(book_config) == 0 else 'failed'
+    except Exception as e:
+        status = 'failed'
+        error = str(e)
+        logger.error(f"Lỗi khi xử lý sách {name}: {error}", exc_info=True)
+    return {
+        'name': name,
+        'status': status,
+        'seconds': round(time.perf_counter() - start, 2),
+        'error': error
+    }
+
+
+class BatchProcessor:
+    def __init__(self, config, output_dir, workers=None):
+        """
+        Khởi tạo bộ xử lý hàng loạt
+        
+        Args:
+            config (dict): Cấu hình gốc từ config.yaml (dùng chung cho mọi sách)
+            output_dir (str): Thư mục gốc chứa kết quả, mỗi sách một thư mục con
+            workers (int): Số sách xử lý song song (None = số CPU)
+        """
+        self.config = config
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        
+    @staticmethod
+    def discover(input_path):
+        """
+        Lấy danh sách PDF từ thư mục hoặc file manifest (mỗi dòng một đường dẫn)
+        
+        Args:
+            input_path (str): Thư mục chứa PDF hoặc file manifest
+            
+        Returns:
+            list: Danh sách đường dẫn PDF
+        """
+        if os.path.isdir(input_path):
+            return sorted(
+                os.path.join(input_path, f)
+                for f in os.listdir(input_path)
+                if f.lower().endswith('.pdf')
+            )
+        
+        base_dir = os.path.dirname(input_path)
+        pdf_paths = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    pdf_paths.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+        return BatchProcessor._check_names(pdf_paths)
+    
+    @staticmethod
+    def _check_names(pdf_paths):
+        """
+        Bỏ đường dẫn lặp lại và từ chối các sách trùng tên: thư mục kết quả, journal,
+        trạng thái các bước và tên sách trong chỉ mục trùng lặp đều theo tên file PDF
+        
+        Args:
+            pdf_paths (list): Danh sách đường dẫn PDF từ manifest
+            
+        Returns:
+            list: Danh sách đường dẫn PDF không lặp
+        """
+        unique = []
+        names = {}
+        for pdf_path in pdf_paths:
+            real_path = os.path.realpath(pdf_path)
+            name = os.path.splitext(os.path.basename(pdf_path))[0]
+            if name in names:
+                if names[name] == real_path:
+                    logger.warning(f"Bỏ qua sách lặp lại trong manifest: {pdf_path}")
+                    continue
+                raise ValueError(f"Hai sách cùng tên '{name}' sẽ ghi đè kết quả của nhau: "
+                                 f"{names[name]} và {real_path}. Hãy đổi tên một file")
+            names[name] = real_path
+            unique.append(pdf_path)
+        return unique
+    
+    def book_config(self, pdf_path):
+        """
+        Tạo cấu hình riêng cho một cuốn sách: đường dẫn đầu ra và trạng thái
+        các bước nằm trong thư mục riêng, chỉ chạy lại bước có thay đổi
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            
+        Returns:
+            tuple: (tên sách, cấu hình)
+        """
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        book_dir = os.path.join(self.output_dir, name)
+        
+        config = copy.deepcopy(self.config)
+        segments_name = ('segments.jsonl' if segment_output_format(config) == 'jsonl'
+                         else 'segments.txt')
+        config['paths'].update({
+            'input_pdf': pdf_path,
+            'output_images': os.path.join(book_dir, 'images'),
+            'raw_text': os.path.join(book_dir, 'raw_text.txt'),
+            'pages': os.path.join(book_dir, 'pages.jsonl'),
+            'clean_text': os.path.join(book_dir, 'clean_text.txt'),
+            'segments': os.path.join(book_dir, segments_name),
+            'segments_index': os.path.join(book_dir, 'segments.idx')
+        })
+        config.setdefault('execution', {})['state_file'] = os.path.join(book_dir, 'stages.json')
+        if config.get('ocr_checkpoint'):
+            config['ocr_checkpoint']['journal'] = os.path.join(book_dir, 'ocr_journal.jsonl')
+        if config.get('profiling'):
+            config['profiling'].update({
+                'metrics_json': os.path.join(book_dir, 'metrics.json'),
+                'metrics_csv': os.path.join(book_dir, 'metrics.csv'),
+                'cprofile_dir': (os.path.join(book_dir, 'profiles')
+                                 if config['profiling'].get('cprofile_dir') else None)
+            })
+        
+        # Chia CPU cho các sách chạy đồng thời để tránh quá tải
+        config['ocr']['workers'] = max(1, (os.cpu_count() or 1) // self.workers)
+        if config.get('parallel_text'):
+            config['parallel_text']['workers'] = config['ocr']['workers']
+        return name, config
+    
+    def _page_count(self, pdf_path):
+        """Đọc số trang PDF, trả về 0 nếu không đọc được"""
+        from src.pdf_to_images import PDFToImageConverter
+        try:
+            num_pages, _ = PDFToImageConverter(dpi=self.config['ocr']['dpi']).get_page_info(pdf_path)
+            return num_pages
+        except Exception as e:
+            logger.warning(f"Không đọc được số trang của {pdf_path}: {str(e)}")
+            return 0
+    
+    def run(self, pdf_paths):
+        """
+        Xử lý toàn bộ danh sách PDF. Sách nhiều trang được đưa vào trước
+        (longest-processing-time first) để sách lớn không kết thúc sau cùng.
+        
+        Args:
+            pdf_paths (list): Danh sách đường dẫn PDF
+            
+        Returns:
+            dict: Báo cáo tổng hợp
+        """
+        logger.info(f"Bắt đầu xử lý hàng loạt {len(pdf_paths)} sách với {self.workers} tiến trình")
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        books = []
+        for pdf_path in pdf_paths:
+            name, config = self.book_config(pdf_path)
+            books.append((self._page_count(pdf_path), name, pdf_path, config))
+        books.sort(key=lambda book: book[0], reverse=True)
+        
+        results = []
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=min(self.workers, max(1, len(books)))) as executor:
+            futures = {
+                executor.submit(_process_book, name, config): (pages, name, pdf_path)
+                for pages, name, pdf_path, config in books
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                pages, name, pdf_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'name': name, 'status': 'failed', 'seconds': None, 'error': str(e)}
+                result.update({'pdf': pdf_path, 'pages': pages})
+                results.append(result)
+                logger.info(f"[{done}/{len(books)}] {name}: {result['status']} "
+                            f"({pages} trang, {result['seconds']} giây)")
+        
+        report = {
+            'total_books': len(results),
+            'succeeded': sum(1 for r in results if r['status'] == 'ok'),
+            'failed': sum(1 for r in results if r['status'] != 'ok'),
+            'total_pages': sum(r['pages'] for r in results),
+            'wall_seconds': round(time.perf_counter() - start, 2),
+            'books': sorted(results, key=lambda r: r['name'])
+        }
+        self.save_report(report)
+        return report
+    
+    def save_report(self, report):
+        """
+        Lưu báo cáo tổng hợp (JSON) và ghi log thời gian từng sách
+        
+        Args:
+            report (dict): Báo cáo từ run()
+        """
+        report_path = os.path.join(self.output_dir, 'batch_report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        
+        logger.info("=" * 60)
+        logger.info(f"Tổng: {report['succeeded']}/{report['total_books']} sách thành công, "
+                    f"{report['total_pages']} trang, {report['wall_seconds']} giây")
+        for book in report['books']:
+            logger.info(f"  {book['name']:<40} {book['status']:<7} "
+                        f"{book['pages']:>5} trang  {book['seconds']} giây")
+        logger.info(f"Đã lưu báo cáo: {report_path}")
@@ -0,0 +1,157 @@
+"""
+Module phát hiện trang trắng/gần trắng (bỏ qua OCR) và trang chỉ có hình minh họa
+bằng mật độ mực và các vùng mực liền khối (vector hóa bằng NumPy)
+"""
+import numpy as np
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+class BlankPageDetector:
+    # Kích thước ô (pixel ở độ phân giải làm việc) khi tìm vùng mực đặc
+    CELL_SIZE = 16
+
+    def __init__(self, ink_threshold=128, max_ink_ratio=0.005, min_components=3,
+                 min_component_pixels=6, border=0.03, illustration_ratio=0.3,
+                 dense_cell_ratio=0.5, source_dpi=300, work_dpi=100):
+        """
+        Khởi tạo bộ phát hiện trang trắng
+
+        Args:
+            ink_threshold (int): Pixel xám tối hơn ngưỡng này là mực
+            max_ink_ratio (float): Trang có tỷ lệ mực cao hơn chắc chắn không phải trang trắng
+            min_components (int): Trang có ít vùng mực hơn số này (bỏ qua chấm nhiễu) là trang trắng
+            min_component_pixels (int): Vùng mực nhỏ hơn số pixel này là nhiễu
+            border (float): Tỷ lệ viền mỗi cạnh bị bỏ qua (bóng gáy sách, mép scan)
+            illustration_ratio (float): Vùng mực đặc liền khối chiếm từ tỷ lệ này
+                                        của trang là trang hình minh họa (0 = không kiểm tra)
+            dense_cell_ratio (float): Ô có tỷ lệ mực từ mức này là ô mực đặc
+            source_dpi (int): DPI của ảnh trang
+            work_dpi (int): DPI làm việc sau khi thu nhỏ
+        """
+        self.ink_threshold = ink_threshold
+        self.max_ink_ratio = max_ink_ratio
+        self.min_components = min_components
+        self.min_component_pixels = min_component_pixels
+        self.border = border
+        self.illustration_ratio = illustration_ratio
+        self.dense_cell_ratio = dense_cell_ratio
+        self.factor = max(1, round(source_dpi / work_dpi))
+
+    def signature(self):
+        """Chuỗi mô tả cấu hình, dùng để phân biệt checkpoint OCR"""
+        return (f"blank:{self.ink_threshold}:{self.max_ink_ratio}:{self.min_components}:"
+                f"{self.min_component_pixels}:{self.border}:{self.illustration_ratio}:"
+                f"{self.dense_cell_ratio}:{self.factor}")
+
+    @staticmethod
+    def _pool(values, factor, reduce):
+        """Gộp từng khối factor x factor pixel bằng hàm reduce (min/mean), bỏ phần dư ở mép"""
+        height = values.shape[0] // factor * factor
+        width = values.shape[1] // factor * factor
+        blocks = values[:height, :width].reshape(height // factor, factor, width // factor, factor)
+        return reduce(blocks, axis=(1, 3))
+
+    @staticmethod
+    def component_sizes(mask):
+        """
+        Kích thước các vùng liền khối (8 hướng) của mặt nạ, gán nhãn theo đoạn chạy
+        từng hàng: tìm đoạn chạy vector hóa, hợp nhất đoạn chồng nhau bằng union-find
+
+        Args:
+            mask (np.ndarray): Mặt nạ bool 2 chiều
+
+        Returns:
+            list: Số pixel của từng vùng
+        """
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[1]
+        rows, starts, ends = rows.tolist(), starts.tolist(), ends.tolist()
+
+        parent = list(range(len(rows)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Đoạn i của hàng r nối với đoạn j của hàng r - 1 khi chồng nhau (kể cả chéo)
+        prev_first = prev_last = 0
+        first = 0
+        while first < len(rows):
+            row = rows[first]
+            last = first
+            while last < len(rows) and rows[last] == row:
+                last += 1
+            if prev_last > prev_first and rows[prev_first] == row - 1:
+                j = prev_first
+                for i in range(first, last):
+                    while j < prev_last and ends[j] < starts[i]:
+                        j += 1
+                    k = j
+                    while k < prev_last and starts[k] <= ends[i]:
+                        root_i, root_k = find(i), find(k)
+                        if root_i != root_k:
+                            parent[root_k] = root_i
+                        k += 1
+            prev_first, prev_last = first, last
+            first = last
+
+        sizes = {}
+        for i in range(len(rows)):
+            root = find(i)
+            sizes[root] = sizes.get(root, 0) + ends[i] - starts[i]
+        return list(sizes.values())
+
+    def classify(self, img):
+        """
+        Phân loại một trang
+
+        Args:
+            img (PIL.Image.Image): Ảnh trang
+
+        Returns:
+            str: 'blank' (bỏ qua OCR), 'illustration' (chỉ có hình) hoặc 'text'
+        """
+        gray = np.asarray(img.convert('L'))
+        # Lấy giá trị tối nhất mỗi khối để nét chữ mảnh không mất khi thu nhỏ
+        small = self._pool(gray, self.factor, np.min)
+        height, width = small.shape
+        top, left = int(height * self.border), int(width * self.border)
+        ink = small[top:height - top, left:width - left] < self.ink_threshold
+        if ink.size == 0:
+            return 'blank'
+
+        if ink.mean() <= self.max_ink_ratio:
+            specks = self.min_component_pixels
+            components = sum(1 for size in self.component_sizes(ink) if size >= specks)
+            if components < self.min_components:
+                return 'blank'
+
+        if self.illustration_ratio:
+            dense = self._pool(ink, self.CELL_SIZE, np.mean) >= self.dense_cell_ratio
+            if dense.any():
+                largest = max(self.component_sizes(dense))
+                if largest >= self.illustration_ratio * dense.size:
+                    return 'illustration'
+        return 'text'
+
+    @staticmethod
+    def log_stats(records):
+        """
+        Thống kê số trang bỏ qua OCR và trang hình minh họa
+
+        Args:
+            records (list): Bản ghi các trang
+        """
+        blank = [r['page'] for r in records if r.get('layout') == 'blank']
+        illustrations = [r['page'] for r in records if r.get('layout') == 'illustration']
+        if blank:
+            logger.info(f"Bỏ qua OCR {len(blank)}/{len(records)} trang trắng: {blank}")
+        if illustrations:
+            logger.info(f"{len(illustrations)} trang chỉ có hình minh họa "
+                        f"(cần kiểm tra): {illustrations}")
@@ -0,0 +1,151 @@
+"""
+Module gộp bước chuyển PDF sang ảnh và OCR: ảnh trang được đưa thẳng
+vào OCR qua hàng đợi trong bộ nhớ, không cần ghi/đọc lại file PNG
+"""
+import os
+import queue
+import threading
+from src.utils import setup_logging
+from src.ocr_extraction import make_page_record
+
+logger = setup_logging()
+
+# Đánh dấu kết thúc hàng đợi
+_DONE = object()
+
+class FusedPDFOCRPipeline:
+    def __init__(self, converter, ocr, queue_size=4, image_output_dir=None):
+        """
+        Khởi tạo pipeline gộp PDF -> OCR
+        
+        Args:
+            converter (PDFToImageConverter): Bộ render PDF
+            ocr (OCRExtractor): Bộ trích xuất OCR
+            queue_size (int): Số trang tối đa chờ OCR trong hàng đợi
+            image_output_dir (str): Thư mục lưu PNG để debug (None = không lưu)
+        """
+        self.converter = converter
+        self.ocr = ocr
+        self.queue_size = max(1, queue_size)
+        self.image_output_dir = image_output_dir
+        
+    def _produce(self, pdf_path, page_numbers, page_queue, num_consumers, errors):
+        """
+        Luồng sản xuất: render từng trang và đưa vào hàng đợi
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            page_numbers (list): Các trang cần render
+            page_queue (queue.Queue): Hàng đợi trang
+            num_consumers (int): Số luồng OCR cần nhận tín hiệu kết thúc
+            errors (list): Nơi ghi lại lỗi để luồng chính xử lý
+        """
+        try:
+            for page_number, page in self.converter.iter_pages(pdf_path, page_numbers):
+                # put() chặn khi hàng đợi đầy, giới hạn số trang trong bộ nhớ
+                page_queue.put((page_number, page))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(num_consumers):
+                page_queue.put(_DONE)
+    
+    def _consume(self, page_queue, records, lock):
+        """
+        Luồng tiêu thụ: OCR các trang lấy từ hàng đợi
+        
+        Args:
+            page_queue (queue.Queue): Hàng đợi trang
+            records (dict): Kết quả {số trang: bản ghi trang}
+            lock (threading.Lock): Khóa bảo vệ records
+        """
+        while True:
+            item = page_queue.get()
+            if item is _DONE:
+                break
+            
+            page_number, page = item
+            try:
+                if self.image_output_dir:
+                    image_path = os.path.join(self.image_output_dir, f"page_{page_number}.png")
+                    page.save(image_path, "PNG")
+                record = self.ocr.ocr_pil_page(page, page_number)
+            except Exception as e:
+                logger.error(f"Lỗi xử lý trang {page_number}: {str(e)}")
+                record = make_page_record(page_number, "", source='error')
+            finally:
+                page.close()
+            
+            with lock:
+                records[page_number] = record
+            logger.info(f"Đã OCR trang {page_number}")
+    
+    def run(self, pdf_path):
+        """
+        Chạy render và OCR đồng thời cho toàn bộ file PDF
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            
+        Returns:
+            str: Toàn bộ văn bản trích xuất
+        """
+        return self.ocr.join_pages(self.run_pages(pdf_path))
+    
+    def run_pages(self, pdf_path, page_numbers=None):
+        """
+        Chạy render và OCR đồng thời, giữ nguyên ranh giới trang
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            page_numbers (list): Chỉ OCR các trang này (None = tất cả)
+            
+        Returns:
+            list: Bản ghi từng trang theo thứ tự
+        """
+        logger.info(f"Bắt đầu PDF -> OCR trực tiếp: {pdf_path}")
+        if self.image_output_dir:
+            os.makedirs(self.image_output_dir, exist_ok=True)
+            logger.info(f"Lưu ảnh debug vào: {self.image_output_dir}")
+        
+        # pytesseract chạy tesseract ở tiến trình con nên các luồng OCR
+        # thực sự song song, không bị GIL giới hạn
+        num_consumers = self.ocr.workers
+        page_queue = queue.Queue(maxsize=self.queue_size)
+        errors = []
+        lock = threading.Lock()
+        
+        # Các trang đã có trong checkpoint không cần render lại
+        if page_numbers is None:
+            num_pages, _ = self.converter.get_page_info(pdf_path)
+            page_numbers = range(1, num_pages + 1)
+        wanted = set(page_numbers)
+        records = {}
+        if self.ocr.journal:
+            records = {index + 1: dict(record, source='checkpoint')
+                       for index, record in self.ocr.journal.load().items()
+                       if index + 1 in wanted}
+        page_numbers = [n for n in sorted(wanted) if n not in records]
+        
+        producer = threading.Thread(
+            target=self._produce,
+            args=(pdf_path, page_numbers, page_queue, num_consumers, errors),
+            daemon=True
+        )
+        consumers = [
+            threading.Thread(target=self._consume, args=(page_queue, records, lock), daemon=True)
+            for _ in range(num_consumers)
+        ]
+        
+        producer.start()
+        for consumer in consumers:
+            consumer.start()
+        producer.join()
+        for consumer in consumers:
+            consumer.join()
+        
+        if errors:
+            logger.error(f"Lỗi khi chuyển đổi PDF: {str(errors[0])}")
+            raise errors[0]
+        
+        return [records[number] for number in sorted(records)]
@@ -0,0 +1,181 @@
+"""
+Module tự động phát hiện header/footer lặp lại giữa các trang
+(tên sách, tên chương, số trang...) dựa trên kết quả OCR theo trang
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+_NUMBER_REGEX = re.compile(r'\d+')
+
+class RepeatedLineDetector:
+    def __init__(self, zone_lines=2, min_pages=4, min_ratio=0.3, window_pages=8):
+        """
+        Khởi tạo bộ phát hiện dòng lặp ở đầu/cuối trang. Một dòng là header/footer nếu
+        lặp lại trên toàn sách (ngưỡng max(min_pages, min_ratio x số trang)) hoặc dày đặc
+        trong một đoạn trang liên tiếp (tên chương chỉ lặp lại trong chương của nó)
+
+        Args:
+            zone_lines (int): Số dòng có nội dung đầu và cuối mỗi trang được xét
+            min_pages (int): Số trang tối thiểu một dòng phải lặp lại (ngưỡng dưới cho
+                             sách ít trang), cũng là ngưỡng trong mỗi cửa sổ window_pages
+            min_ratio (float): Tỷ lệ trang tối thiểu (so với tổng số trang), tránh loại
+                               các dòng ngắn lặp lại vài lần rải rác trong sách dày
+            window_pages (int): Số trang liên tiếp của cửa sổ; dòng xuất hiện trên ít nhất
+                                min_pages trang trong một cửa sổ cũng bị loại (0 = tắt)
+        """
+        self.zone_lines = zone_lines
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.window_pages = window_pages
+        self.num_pages = 0
+        self.repeated = {}
+        self.removed = 0
+        self.removed_lines = Counter()
+
+    @staticmethod
+    def normalize(line):
+        """
+        Chuẩn hóa dòng để so khớp bất chấp lỗi OCR nhỏ: chữ thường, bỏ dấu,
+        bỏ khoảng trắng và dấu câu
+
+        Args:
+            line (str): Dòng văn bản
+
+        Returns:
+            str: Chuỗi khóa (rỗng nếu dòng không có chữ/số)
+        """
+        line = unicodedata.normalize('NFKD', line.lower()).replace('đ', 'd')
+        return ''.join(ch for ch in line if ch.isalnum() and not unicodedata.combining(ch))
+
+    def _line_keys(self, line, zone, page):
+        """
+        Tạo các khóa đếm cho một dòng trong vùng đầu ('head') hoặc cuối ('tail') trang.
+        Dòng có số sinh thêm khóa (dòng đã che số, số - số trang) để nhận ra
+        số trang in ("Trang 12") mà không gộp nhầm các dòng chỉ tình cờ giống nhau
+
+        Args:
+            line (str): Dòng văn bản
+            zone (str): 'head' hoặc 'tail'
+            page (int): Số trang trong PDF
+
+        Returns:
+            list: Các khóa của dòng
+        """
+        text = self.normalize(line)
+        if not text:
+            return []
+        keys = [(zone, text)]
+        numbers = _NUMBER_REGEX.findall(text)
+        if numbers:
+            masked = _NUMBER_REGEX.sub('#', text)
+            keys.extend((zone, masked, int(n) - page) for n in numbers if len(n) <= 4)
+        return keys
+
+    def _zone_lines(self, lines):
+        """
+        Liệt kê các dòng có nội dung thuộc vùng đầu/cuối trang
+
+        Args:
+            lines (list): Các dòng của trang
+
+        Yields:
+            tuple: (vị trí dòng, vùng)
+        """
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        for i in filled[:self.zone_lines]:
+            yield i, 'head'
+        for i in filled[-self.zone_lines:]:
+            yield i, 'tail'
+
+    def _dense_in_window(self, positions):
+        """
+        Có cửa sổ window_pages trang liên tiếp nào chứa ít nhất min_pages trang của khóa
+
+        Args:
+            positions (list): Thứ tự (tăng dần) các trang chứa khóa
+
+        Returns:
+            bool: True nếu khóa dày đặc trong một đoạn trang
+        """
+        need = self.min_pages
+        if not self.window_pages or len(positions) < need:
+            return False
+        # positions[i] và positions[i + need - 1] cùng nằm trong một cửa sổ
+        return any(positions[i + need - 1] - positions[i] < self.window_pages
+                   for i in range(len(positions) - need + 1))
+
+    def fit(self, records):
+        """
+        Ghi lại các trang chứa mỗi dòng đầu/cuối trang (một lượt, không so sánh từng cặp trang)
+
+        Args:
+            records (iterable): Bản ghi trang có khóa 'page' và 'text'
+
+        Returns:
+            dict: Khóa dòng lặp -> số trang xuất hiện
+        """
+        positions = {}
+        num_pages = 0
+        for position, record in enumerate(records):
+            num_pages += 1
+            lines = record['text'].split('\n')
+            page_keys = set()
+            for i, zone in self._zone_lines(lines):
+                page_keys.update(self._line_keys(lines[i], zone, record['page']))
+            for key in page_keys:
+                positions.setdefault(key, []).append(position)
+
+        threshold = max(self.min_pages, math.ceil(self.min_ratio * num_pages))
+        self.num_pages = num_pages
+        self.repeated = {}
+        local = 0
+        for key, pages in positions.items():
+            if len(pages) >= threshold:
+                self.repeated[key] = len(pages)
+            elif self._dense_in_window(pages):
+                self.repeated[key] = len(pages)
+                local += 1
+        logger.info(f"Phát hiện {len(self.repeated)} mẫu header/footer lặp lại "
+                    f"trên {num_pages} trang (ngưỡng {threshold} trang, {local} mẫu lặp "
+                    f"trên {self.min_pages}/{self.window_pages} trang liên tiếp)")
+        return self.repeated
+
+    def strip(self, records):
+        """
+        Loại bỏ các dòng lặp đã phát hiện ở vùng đầu/cuối mỗi trang
+
+        Args:
+            records (iterable): Bản ghi trang (có thể là generator load_pages)
+
+        Yields:
+            dict: Bản ghi trang với văn bản đã loại bỏ header/footer
+        """
+        repeated = self.repeated
+        for record in records:
+            if not repeated:
+                yield record
+                continue
+            lines = record['text'].split('\n')
+            drop = set()
+            for i, zone in self._zone_lines(lines):
+                if any(key in repeated for key in self._line_keys(lines[i], zone, record['page'])):
+                    drop.add(i)
+            if not drop:
+                yield record
+                continue
+            for i in drop:
+                self.removed_lines[_NUMBER_REGEX.sub('#', lines[i].strip())] += 1
+            self.removed += len(drop)
+            text = '\n'.join(line for i, line in enumerate(lines) if i not in drop)
+            yield dict(record, text=text)
+
+    def log_stats(self, top=10):
+        """Ghi log số dòng đã loại bỏ và các dòng bị loại nhiều nhất"""
+        logger.info(f"Đã loại bỏ {self.removed} dòng header/footer lặp lại")
+        for line, count in self.removed_lines.most_common(top):
+            logger.info(f"  {line!r}: {count} trang")
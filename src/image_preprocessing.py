@@ -0,0 +1,159 @@
+"""
+Module tiền xử lý ảnh trước khi OCR: chuyển xám/nhị phân, cắt lề,
+thu nhỏ ảnh theo chiều cao dòng chữ (các phép tính vector hóa bằng NumPy)
+"""
+import numpy as np
+from PIL import Image
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+class ImagePreprocessor:
+    def __init__(self, mode='binary', crop_margins=True, margin=20,
+                 target_line_height=40, source_dpi=300, min_dpi=150):
+        """
+        Khởi tạo bộ tiền xử lý
+        
+        Args:
+            mode (str): 'grayscale' hoặc 'binary' (ngưỡng Otsu)
+            crop_margins (bool): Tự động cắt lề trắng quanh vùng chữ
+            margin (int): Số pixel giữ lại quanh vùng chữ khi cắt
+            target_line_height (int): Chiều cao dòng chữ mong muốn (pixel) sau khi thu nhỏ
+            source_dpi (int): DPI của ảnh đầu vào
+            min_dpi (int): Không thu nhỏ xuống dưới DPI này
+        """
+        self.mode = mode
+        self.crop_margins = crop_margins
+        self.margin = margin
+        self.target_line_height = target_line_height
+        self.source_dpi = source_dpi
+        self.min_dpi = min_dpi
+        
+    def signature(self):
+        """Chuỗi mô tả cấu hình, dùng để phân biệt kết quả OCR trong cache"""
+        return (f"pre:{self.mode}:{int(self.crop_margins)}:{self.margin}:"
+                f"{self.target_line_height}:{self.source_dpi}:{self.min_dpi}")
+    
+    @staticmethod
+    def otsu_threshold(gray):
+        """
+        Tính ngưỡng Otsu từ histogram (vector hóa, không lặp theo pixel)
+        
+        Args:
+            gray (np.ndarray): Ảnh xám uint8
+            
+        Returns:
+            int: Ngưỡng, pixel <= ngưỡng là mực
+        """
+        hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        total = hist.sum()
+        if total == 0:
+            return 127
+        levels = np.arange(256)
+        weight_bg = np.cumsum(hist)
+        weight_fg = total - weight_bg
+        cum_mean = np.cumsum(hist * levels)
+        mean_bg = cum_mean / np.maximum(weight_bg, 1)
+        mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        return int(np.argmax(between))
+    
+    @staticmethod
+    def _runs(flags):
+        """
+        Tìm các đoạn liên tiếp True trong mảng 1 chiều
+        
+        Args:
+            flags (np.ndarray): Mảng bool
+            
+        Returns:
+            tuple: (vị trí bắt đầu, độ dài) của từng đoạn
+        """
+        padded = np.concatenate(([0], flags.astype(np.int8), [0]))
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return starts, ends - starts
+    
+    def find_text_box(self, ink):
+        """
+        Xác định khung chứa chữ (bỏ qua nhiễu lẻ tẻ ở lề)
+        
+        Args:
+            ink (np.ndarray): Mặt nạ bool, True là pixel mực
+            
+        Returns:
+            tuple: (left, top, right, bottom) hoặc None nếu trang trống
+        """
+        height, width = ink.shape
+        rows = ink.sum(axis=1) > max(1, width * 0.002)
+        cols = ink.sum(axis=0) > max(1, height * 0.002)
+        if not rows.any() or not cols.any():
+            return None
+        top, bottom = np.flatnonzero(rows)[[0, -1]]
+        left, right = np.flatnonzero(cols)[[0, -1]]
+        return (max(0, left - self.margin), max(0, top - self.margin),
+                min(width, right + 1 + self.margin), min(height, bottom + 1 + self.margin))
+    
+    @classmethod
+    def estimate_line_height(cls, ink):
+        """
+        Ước tính chiều cao dòng chữ từ profile theo hàng
+        
+        Args:
+            ink (np.ndarray): Mặt nạ bool, True là pixel mực
+            
+        Returns:
+            float: Trung vị chiều cao dòng (pixel), None nếu không xác định được
+        """
+        width = ink.shape[1]
+        rows = ink.sum(axis=1) > max(1, width * 0.01)
+        _, lengths = cls._runs(rows)
+        lengths = lengths[lengths >= 5]  # bỏ gạch ngang, nhiễu
+        if lengths.size == 0:
+            return None
+        return float(np.median(lengths))
+    
+    def process(self, img):
+        """
+        Tiền xử lý một trang
+        
+        Args:
+            img (PIL.Image.Image): Ảnh trang gốc
+            
+        Returns:
+            tuple: (ảnh đã xử lý, dict thông tin: crop, line_height, scale, dpi)
+        """
+        gray_img = img.convert('L')
+        gray = np.asarray(gray_img)
+        ink = gray <= self.otsu_threshold(gray)
+        info = {'crop': None, 'line_height': None, 'scale': 1.0, 'dpi': self.source_dpi}
+        
+        if self.crop_margins:
+            box = self.find_text_box(ink)
+            if box is not None:
+                left, top, right, bottom = box
+                info['crop'] = box
+                gray_img = gray_img.crop(box)
+                ink = ink[top:bottom, left:right]
+        
+        line_height = self.estimate_line_height(ink)
+        info['line_height'] = line_height
+        if line_height:
+            min_scale = self.min_dpi / self.source_dpi
+            scale = min(1.0, max(min_scale, self.target_line_height / line_height))
+            if scale < 0.98:
+                size = (max(1, round(gray_img.width * scale)), max(1, round(gray_img.height * scale)))
+                gray_img = gray_img.resize(size, Image.Resampling.LANCZOS)
+                info['scale'] = round(scale, 3)
+                info['dpi'] = round(self.source_dpi * scale)
+        
+        if self.mode == 'binary':
+            gray = np.asarray(gray_img)
+            binary = np.where(gray > self.otsu_threshold(gray), 255, 0).astype(np.uint8)
+            result = Image.fromarray(binary)
+        else:
+            result = gray_img
+        
+        result.info['dpi'] = (info['dpi'], info['dpi'])
+        return result, info
@@ -0,0 +1,268 @@
+"""
+Module các backend OCR: pytesseract (gọi tiến trình tesseract cho mỗi trang)
+và tesserocr (giữ một engine Tesseract đã khởi tạo, dùng lại cho nhiều trang)
+"""
+import re
+import shlex
+import threading
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# Chỉ định đường dẫn đến tesseract.exe
+TESSERACT_CMD = r'C:/Program Files/Tesseract-OCR/tesseract.exe'
+
+# Mỗi luồng (và mỗi tiến trình con) giữ engine riêng vì engine không thread-safe
+_local = threading.local()
+_fallback_warned = False
+
+class PytesseractBackend:
+    name = 'pytesseract'
+    
+    def __init__(self, language, config):
+        """
+        Backend gọi lệnh tesseract qua pytesseract
+        
+        Args:
+            language (str): Ngôn ngữ nhận dạng
+            config (str): Cấu hình Tesseract dạng dòng lệnh
+        """
+        import pytesseract
+        from PIL import Image
+        
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        self._pytesseract = pytesseract
+        self._open_image = Image.open
+        self.language = language
+        self.config = config
+        
+    def verify(self):
+        """
+        Kiểm tra Tesseract có hoạt động không
+        
+        Returns:
+            list: Danh sách ngôn ngữ có sẵn
+        """
+        version = self._pytesseract.get_tesseract_version()
+        logger.info(f"Tesseract version: {version}")
+        return self._pytesseract.get_languages()
+    
+    def describe_missing(self):
+        """Hướng dẫn khi không tìm thấy Tesseract"""
+        return (
+            "Tesseract not found! Please check:\n"
+            f"1. Tesseract installed at: {self._pytesseract.pytesseract.tesseract_cmd}\n"
+            "2. PATH environment variable is set correctly"
+        )
+    
+    def recognize_file(self, image_path, with_confidence=False):
+        """
+        OCR một file ảnh
+        
+        Args:
+            image_path (str): Đường dẫn file ảnh
+            with_confidence (bool): Lấy thêm độ tin cậy trung bình
+            
+        Returns:
+            tuple: (văn bản, độ tin cậy 0-100 hoặc None)
+        """
+        with self._open_image(image_path) as img:
+            return self.recognize_image(img, with_confidence)
+    
+    def recognize_image(self, img, with_confidence=False):
+        """
+        OCR một ảnh PIL
+        
+        Args:
+            img (PIL.Image.Image): Ảnh trang
+            with_confidence (bool): Lấy thêm độ tin cậy trung bình
+            
+        Returns:
+            tuple: (văn bản, độ tin cậy 0-100 hoặc None)
+        """
+        # pytesseract ghi ảnh ra file tạm theo img.format (mặc định PNG);
+        # BMP không nén nên tránh được chi phí mã hóa PNG ở 300 DPI. Đặt trên bản sao
+        # (chép bộ nhớ, rẻ hơn nhiều so với OCR) để không sửa ảnh của bên gọi
+        if not img.format:
+            img = img.copy()
+            img.format = 'BMP'
+        if not with_confidence:
+            return self._pytesseract.image_to_string(img, lang=self.language, config=self.config), None
+        
+        # Một lần chạy tesseract ghi cả file txt (văn bản giống hệt image_to_string, nên
+        # raw_text không phụ thuộc việc lấy độ tin cậy) lẫn file tsv (độ tin cậy từng từ).
+        # Khi đã yêu cầu tsv, tesseract chỉ ghi txt nếu bật tessedit_create_txt
+        module = self._pytesseract.pytesseract
+        with module.save(img) as (temp_name, input_filename):
+            module.run_tesseract(input_filename, temp_name, 'txt', self.language,
+                                 f"-c tessedit_create_txt=1 -c tessedit_create_tsv=1 "
+                                 f"{self.config.strip()}")
+            with open(f"{temp_name}.txt", 'rb') as f:
+                text = f.read().decode('utf-8')
+            with open(f"{temp_name}.tsv", 'rb') as f:
+                data = module.file_to_dict(f.read().decode('utf-8'), '\t', -1)
+        return text, mean_confidence(data)
+    
+    def close(self):
+        pass
+
+
+def mean_confidence(data):
+    """
+    Độ tin cậy trung bình của các từ (bỏ qua phần tử không phải từ, conf = -1)
+    
+    Args:
+        data (dict): Kết quả pytesseract.image_to_data(output_type=DICT)
+        
+    Returns:
+        float: Độ tin cậy 0-100, None nếu trang không có từ nào
+    """
+    confidences = [float(conf) for conf, word in zip(data.get('conf', []), data.get('text', []))
+                   if float(conf) >= 0 and word.strip()]
+    if not confidences:
+        return None
+    return sum(confidences) / len(confidences)
+
+
+def _parse_tesseract_config(config):
+    """
+    Tách cấu hình dòng lệnh Tesseract thành psm, oem và biến -c
+    
+    Args:
+        config (str): Ví dụ "--psm 6 --oem 1 -c preserve_interword_spaces=1"
+        
+    Returns:
+        tuple: (psm hoặc None, oem hoặc None, dict biến)
+    """
+    psm = oem = None
+    variables = {}
+    args = shlex.split(config or '')
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == '--psm' and value is not None:
+            psm = int(value)
+            i += 1
+        elif arg == '--oem' and value is not None:
+            oem = int(value)
+            i += 1
+        elif arg == '-c' and value is not None and '=' in value:
+            key, val = value.split('=', 1)
+            variables[key] = val
+            i += 1
+        elif re.match(r'^-c\w+=', arg):
+            key, val = arg[2:].split('=', 1)
+            variables[key] = val
+        else:
+            logger.warning(f"tesserocr: bỏ qua tham số không hỗ trợ '{arg}'")
+        i += 1
+    return psm, oem, variables
+
+
+class TesserocrBackend:
+    name = 'tesserocr'
+    
+    def __init__(self, language, config):
+        """
+        Backend dùng C API của Tesseract qua tesserocr. Engine và dữ liệu
+        ngôn ngữ chỉ được nạp một lần rồi dùng lại cho mọi trang.
+        
+        Args:
+            language (str): Ngôn ngữ nhận dạng
+            config (str): Cấu hình Tesseract dạng dòng lệnh
+        """
+        import tesserocr
+        
+        self._tesserocr = tesserocr
+        self.language = language
+        self.config = config
+        
+        psm, oem, variables = _parse_tesseract_config(config)
+        kwargs = {'lang': language}
+        if psm is not None:
+            kwargs['psm'] = psm
+        if oem is not None:
+            kwargs['oem'] = oem
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        for key, value in variables.items():
+            self.api.SetVariable(key, value)
+        
+    def verify(self):
+        """
+        Kiểm tra Tesseract có hoạt động không (không gọi tiến trình con)
+        
+        Returns:
+            list: Danh sách ngôn ngữ có sẵn
+        """
+        logger.info(f"Tesseract version: {self._tesserocr.tesseract_version().splitlines()[0]}")
+        _, langs = self._tesserocr.get_languages()
+        return langs
+    
+    def describe_missing(self):
+        """Hướng dẫn khi không nạp được Tesseract"""
+        return (
+            "Cannot initialize Tesseract through tesserocr! Please check:\n"
+            "1. tesserocr is built against the installed Tesseract\n"
+            "2. TESSDATA_PREFIX points to the folder containing the traineddata"
+        )
+    
+    def recognize_file(self, image_path, with_confidence=False):
+        """OCR một file ảnh (Leptonica đọc file trực tiếp), trả về (văn bản, độ tin cậy)"""
+        self.api.SetImageFile(image_path)
+        return self._recognize(with_confidence)
+    
+    def recognize_image(self, img, with_confidence=False):
+        """OCR một ảnh PIL trong bộ nhớ, không ghi file tạm, trả về (văn bản, độ tin cậy)"""
+        self.api.SetImage(img)
+        return self._recognize(with_confidence)
+    
+    def _recognize(self, with_confidence):
+        text = self.api.GetUTF8Text()
+        # MeanTextConf dùng lại kết quả nhận dạng vừa chạy, không tốn thêm một lần OCR
+        confidence = float(self.api.MeanTextConf()) if with_confidence else None
+        return text, confidence
+    
+    def close(self):
+        self.api.End()
+
+
+BACKENDS = {
+    'pytesseract': PytesseractBackend,
+    'tesserocr': TesserocrBackend,
+}
+
+def get_backend(name, language, config):
+    """
+    Lấy engine OCR của luồng hiện tại, tạo mới ở lần gọi đầu tiên.
+    Nếu không nạp được tesserocr sẽ quay về pytesseract.
+    
+    Args:
+        name (str): 'pytesseract' hoặc 'tesserocr'
+        language (str): Ngôn ngữ nhận dạng
+        config (str): Cấu hình Tesseract
+        
+    Returns:
+        PytesseractBackend | TesserocrBackend: Engine dùng lại được
+    """
+    global _fallback_warned
+    
+    engines = getattr(_local, 'engines', None)
+    if engines is None:
+        engines = _local.engines = {}
+    
+    key = (name, language, config)
+    if key not in engines:
+        backend_class = BACKENDS.get(name)
+        if backend_class is None:
+            raise ValueError(f"Backend OCR không hợp lệ: {name}. Chọn một trong {list(BACKENDS)}")
+        try:
+            engines[key] = backend_class(language, config)
+        except (ImportError, RuntimeError) as e:
+            if name == 'pytesseract':
+                raise
+            if not _fallback_warned:
+                logger.warning(f"Không dùng được backend {name} ({str(e)}), chuyển sang pytesseract")
+                _fallback_warned = True
+            engines[key] = PytesseractBackend(language, config)
+    return engines[key]
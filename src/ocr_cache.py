@@ -0,0 +1,187 @@
+"""
+Module cache kết quả OCR theo từng trang, khóa theo nội dung ảnh
+"""
+import hashlib
+import os
+import threading
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+class OCRCache:
+    def __init__(self, cache_dir, max_size_mb=512):
+        """
+        Khởi tạo cache OCR trên đĩa
+        
+        Args:
+            cache_dir (str): Thư mục lưu cache
+            max_size_mb (int): Dung lượng tối đa, vượt quá sẽ xóa mục cũ nhất
+        """
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        self._sizes = self._scan()
+        self._total_size = sum(self._sizes.values())
+        
+    def _scan(self):
+        """Đọc kích thước các mục đang có trong cache"""
+        sizes = {}
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.txt'):
+                    path = os.path.join(root, name)
+                    sizes[path] = os.path.getsize(path)
+        return sizes
+    
+    @staticmethod
+    def make_key(image_bytes, language, config):
+        """
+        Tạo khóa cache từ nội dung ảnh và cấu hình OCR
+        
+        Args:
+            image_bytes (bytes): Nội dung ảnh
+            language (str): Ngôn ngữ nhận dạng
+            config (str): Cấu hình Tesseract
+            
+        Returns:
+            str: Khóa dạng hex
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(image_bytes)
+        digest.update(b'\0' + language.encode('utf-8'))
+        digest.update(b'\0' + config.encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def image_bytes(img):
+        """
+        Lấy bytes đại diện cho ảnh PIL (kèm kích thước và mode)
+        
+        Args:
+            img (PIL.Image.Image): Ảnh trang
+            
+        Returns:
+            bytes: Nội dung ảnh
+        """
+        header = f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode('ascii')
+        return header + img.tobytes()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.txt')
+    
+    @staticmethod
+    def _confidence_path(path):
+        """File phụ lưu độ tin cậy cạnh file văn bản của một mục"""
+        return path[:-len('.txt')] + '.conf'
+    
+    def get(self, key):
+        """
+        Lấy kết quả OCR đã lưu
+        
+        Args:
+            key (str): Khóa cache
+            
+        Returns:
+            str: Văn bản đã lưu, hoặc None nếu chưa có
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        # Cập nhật thời gian truy cập để xóa theo LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return text
+    
+    def confidence(self, key):
+        """
+        Lấy độ tin cậy đã lưu cùng kết quả OCR
+        
+        Args:
+            key (str): Khóa cache
+            
+        Returns:
+            float: Độ tin cậy 0-100, None nếu mục không lưu độ tin cậy
+        """
+        try:
+            with open(self._confidence_path(self._path(key)), 'r', encoding='utf-8') as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, key, text, confidence=None):
+        """
+        Lưu kết quả OCR vào cache
+        
+        Args:
+            key (str): Khóa cache
+            text (str): Văn bản OCR
+            confidence (float): Độ tin cậy trung bình của trang (None = không lưu)
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if confidence is not None:
+            # Ghi trước file văn bản: mục đã có văn bản thì độ tin cậy cũng đã sẵn sàng
+            with open(self._confidence_path(path), 'w', encoding='utf-8') as f:
+                f.write(repr(confidence))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_size += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            if self._total_size > self.max_size:
+                self._evict()
+    
+    def _evict(self):
+        """Xóa các mục ít được dùng gần đây nhất đến khi còn 90% dung lượng"""
+        target = self.max_size * 0.9
+        entries = []
+        for path in self._sizes:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                entries.append((0, path))
+        entries.sort()
+        
+        removed = 0
+        for _, path in entries:
+            if self._total_size <= target:
+                break
+            for stale in (path, self._confidence_path(path)):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            self._total_size -= self._sizes.pop(path)
+            removed += 1
+        logger.info(f"Cache OCR: đã xóa {removed} mục cũ")
+    
+    @property
+    def hit_rate(self):
+        """Tỉ lệ trúng cache (0-1)"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def log_stats(self):
+        """Ghi log thống kê cache"""
+        logger.info(
+            f"Cache OCR: {self.hits} trúng / {self.hits + self.misses} trang "
+            f"({self.hit_rate:.1%}), dung lượng {self._total_size / 1024 / 1024:.1f} MB"
+        )
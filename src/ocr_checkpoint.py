@@ -0,0 +1,109 @@
+"""
+Module checkpoint cho OCR: ghi kết quả từng trang vào journal (append-only)
+để có thể chạy tiếp khi tiến trình bị dừng giữa chừng
+"""
+import hashlib
+import json
+import os
+import threading
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# Tăng khi định dạng bản ghi trong journal thay đổi
+JOURNAL_VERSION = 2
+
+def make_fingerprint(*parts):
+    """
+    Tạo dấu vân tay cho một lần chạy OCR từ các tham số đầu vào
+    
+    Args:
+        *parts: Các giá trị đầu vào (đường dẫn file sẽ được kèm kích thước và thời gian sửa)
+        
+    Returns:
+        str: Dấu vân tay dạng hex
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        items = part if isinstance(part, (list, tuple)) else [part]
+        for item in items:
+            value = str(item)
+            if isinstance(item, str) and os.path.isfile(item):
+                stat = os.stat(item)
+                value = f"{item}:{stat.st_size}:{stat.st_mtime_ns}"
+            digest.update(value.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+class OCRJournal:
+    def __init__(self, path, fingerprint):
+        """
+        Khởi tạo journal OCR
+        
+        Args:
+            path (str): Đường dẫn file journal (JSONL)
+            fingerprint (str): Dấu vân tay của lần chạy, journal cũ khác dấu sẽ bị bỏ
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        
+    def load(self):
+        """
+        Đọc các trang đã hoàn thành từ journal. Journal của lần chạy khác
+        (khác dấu vân tay) sẽ được tạo lại.
+        
+        Returns:
+            dict: {vị trí trang (bắt đầu từ 0): bản ghi trang}
+        """
+        pages = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = f.readline()
+                try:
+                    header = json.loads(header)
+                    valid = (header.get('fingerprint') == self.fingerprint
+                             and header.get('version') == JOURNAL_VERSION)
+                except (ValueError, AttributeError):
+                    valid = False
+                
+                if valid:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Dòng cuối bị ghi dở khi tiến trình bị dừng
+                            break
+                        pages[record['page'] - 1] = record
+            
+            if not valid:
+                logger.info("Checkpoint OCR không khớp đầu vào hiện tại, bắt đầu lại")
+        
+        # Ghi lại journal gọn (bỏ dòng hỏng) rồi mở để ghi tiếp
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'fingerprint': self.fingerprint, 'version': JOURNAL_VERSION}) + '\n')
+            for index in sorted(pages):
+                f.write(json.dumps(pages[index], ensure_ascii=False) + '\n')
+        
+        if pages:
+            logger.info(f"Tiếp tục từ checkpoint: {len(pages)} trang đã OCR")
+        return pages
+    
+    def record(self, record):
+        """
+        Ghi kết quả một trang vào journal và đẩy xuống đĩa ngay
+        
+        Args:
+            record (dict): Bản ghi trang (xem make_page_record)
+        """
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def clear(self):
+        """Xóa journal sau khi đã lưu kết quả cuối cùng"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
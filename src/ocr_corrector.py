@@ -0,0 +1,201 @@
+"""
+Module sửa lỗi OCR tiếng Việt theo từ điển (sai dấu, tách âm tiết, nhầm ký tự)
+bằng automaton Aho-Corasick, thay thế toàn bộ trong một lượt quét
+"""
+import hashlib
+import marshal
+import os
+import threading
+import unicodedata
+from collections import deque
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# Tăng khi đổi cấu trúc file automaton đã biên dịch
+AUTOMATON_VERSION = 1
+
+class OCRCorrector:
+    def __init__(self, goto, fail, out):
+        """
+        Khởi tạo từ automaton đã biên dịch (dùng OCRCorrector.load hoặc from_entries)
+
+        Args:
+            goto (list): Bảng chuyển trạng thái, mỗi trạng thái là dict ký tự -> trạng thái
+            fail (list): Trạng thái fail của từng trạng thái
+            out (list): Các mục khớp tại mỗi trạng thái, (độ dài, từ thay thế), dài nhất trước
+        """
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+        self.corrections = 0
+
+    @staticmethod
+    def read_entries(dictionary_path):
+        """
+        Đọc từ điển dạng TSV: mỗi dòng "từ sai<TAB>từ đúng", dòng bắt đầu bằng # là chú thích
+
+        Args:
+            dictionary_path (str): File từ điển
+
+        Returns:
+            dict: Từ sai -> từ đúng (đã chuẩn hóa NFC)
+        """
+        entries = {}
+        with open(dictionary_path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line.strip() or line.startswith('#'):
+                    continue
+                parts = line.split('\t')
+                if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+                    logger.warning(f"  Bỏ qua dòng {number} không hợp lệ trong {dictionary_path}: {line!r}")
+                    continue
+                wrong, right = (unicodedata.normalize('NFC', p.strip()) for p in parts)
+                entries[wrong] = right
+        return entries
+
+    @staticmethod
+    def _with_case_variants(entries):
+        """Thêm biến thể viết hoa chữ cái đầu và viết hoa toàn bộ cho mỗi mục"""
+        variants = dict(entries)
+        for wrong, right in entries.items():
+            for make in (lambda s: s[:1].upper() + s[1:], str.upper):
+                variants.setdefault(make(wrong), make(right))
+        return variants
+
+    @staticmethod
+    def _match_case(source, right):
+        """Giữ kiểu viết hoa của đoạn khớp trong văn bản cho từ thay thế"""
+        if len(source) > 1 and source.isupper():
+            return right.upper()
+        if source[:1].isupper():
+            return right[:1].upper() + right[1:]
+        return right
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Biên dịch automaton Aho-Corasick từ bảng thay thế
+
+        Args:
+            entries (dict): Từ sai -> từ đúng
+
+        Returns:
+            OCRCorrector: Bộ sửa lỗi
+        """
+        goto = [{}]
+        out = [[]]
+        for wrong, right in cls._with_case_variants(entries).items():
+            state = 0
+            for ch in wrong:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    out.append([])
+                state = next_state
+            out[state].append((len(wrong), right))
+
+        # Duyệt theo chiều rộng để tính fail link và gộp kết quả của hậu tố
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_state] = goto[f].get(ch, 0)
+                out[next_state].extend(out[fail[next_state]])
+                queue.append(next_state)
+
+        out = [tuple(sorted(matches, reverse=True)) for matches in out]
+        return cls(goto, fail, out)
+
+    @classmethod
+    def load(cls, dictionary_path, compiled_path=None):
+        """
+        Nạp từ điển, dùng lại automaton đã biên dịch nếu từ điển không đổi
+
+        Args:
+            dictionary_path (str): File từ điển TSV
+            compiled_path (str): File automaton đã biên dịch (None = luôn biên dịch lại)
+
+        Returns:
+            OCRCorrector: Bộ sửa lỗi
+        """
+        with open(dictionary_path, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+        if compiled_path and os.path.exists(compiled_path):
+            try:
+                with open(compiled_path, 'rb') as f:
+                    version, cached_digest, goto, fail, out = marshal.load(f)
+                if version == AUTOMATON_VERSION and cached_digest == digest:
+                    logger.info(f"Nạp từ điển sửa lỗi OCR đã biên dịch: {compiled_path}")
+                    return cls(goto, fail, out)
+            except (EOFError, ValueError, TypeError):
+                logger.warning(f"  File automaton hỏng, biên dịch lại: {compiled_path}")
+
+        entries = cls.read_entries(dictionary_path)
+        corrector = cls.from_entries(entries)
+        logger.info(f"Biên dịch từ điển sửa lỗi OCR: {len(entries)} mục, "
+                    f"{len(corrector.goto)} trạng thái")
+
+        if compiled_path:
+            os.makedirs(os.path.dirname(compiled_path) or '.', exist_ok=True)
+            # Tên file tạm riêng cho từng tiến trình/luồng: các sách chạy song song
+            # dùng chung một file automaton
+            tmp_path = f"{compiled_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((AUTOMATON_VERSION, digest, corrector.goto,
+                              corrector.fail, corrector.out), f)
+            os.replace(tmp_path, compiled_path)
+        return corrector
+
+    def correct(self, text):
+        """
+        Sửa lỗi trong một lượt quét. Chỉ thay các mục đứng riêng thành từ/cụm từ
+        (không nằm giữa chữ khác); khi chồng lấn, ưu tiên mục bắt đầu sớm nhất rồi dài nhất.
+        Từ thay thế giữ kiểu viết hoa của đoạn khớp ("Lrong" -> "Trong")
+
+        Args:
+            text (str): Văn bản đầu vào
+
+        Returns:
+            str: Văn bản đã sửa
+        """
+        goto, fail, out = self.goto, self.fail, self.out
+        length = len(text)
+        matches = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            if end < length and text[end].isalnum():
+                continue
+            for size, right in out[state]:
+                start = end - size
+                if start == 0 or not text[start - 1].isalnum():
+                    matches.append((start, -size, end, right))
+
+        if not matches:
+            return text
+
+        matches.sort()
+        parts = []
+        position = 0
+        for start, _, end, right in matches:
+            if start < position:
+                continue
+            parts.append(text[position:start])
+            parts.append(self._match_case(text[start:end], right))
+            position = end
+            self.corrections += 1
+        parts.append(text[position:])
+        return ''.join(parts)
@@ -1,41 +1,139 @@
 """
 Module trích xuất văn bản từ ảnh bằng OCR
 """
-import pytesseract
-from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from src.utils import setup_logging
+from src.profiler import StageProfiler
+from src.ocr_backends import get_backend
 import os
+import time
 
 logger = setup_logging()
 
-# ====== THÊM DÒNG NÀY ======
-# Chỉ định đường dẫn đến tesseract.exe
-pytesseract.pytesseract.tesseract_cmd = r'C:/Program Files/Tesseract-OCR/tesseract.exe'
-# ===========================
+def make_page_record(page, text, seconds=None, confidence=None, source='ocr', layout=None):
+    """
+    Tạo bản ghi kết quả OCR của một trang (một dòng trong pages.jsonl)
+    
+    Args:
+        page (int): Số trang (bắt đầu từ 1)
+        text (str): Văn bản của trang
+        seconds (float): Thời gian OCR
+        confidence (float): Độ tin cậy trung bình của Tesseract (0-100)
+        source (str): Nguồn kết quả: 'ocr', 'cache', 'checkpoint', 'blank'...
+        layout (str): Loại trang theo BlankPageDetector: 'text', 'blank', 'illustration'
+                      (None = không kiểm tra)
+        
+    Returns:
+        dict: Bản ghi trang
+    """
+    return {
+        'page': page,
+        'text': text,
+        'chars': len(text),
+        'seconds': round(seconds, 4) if seconds is not None else None,
+        'confidence': round(confidence, 2) if confidence is not None else None,
+        'source': source,
+        'layout': layout
+    }
+
+
+def _ocr_page_worker(index, image_path, language, config, backend='pytesseract', preprocessor=None,
+                     with_confidence=False, page=None, blank_detector=None):
+    """
+    Hàm chạy trong tiến trình con: OCR một trang. Engine OCR được tạo một
+    lần cho mỗi tiến trình và dùng lại cho các trang tiếp theo.
+
+    Args:
+        index (int): Vị trí trang trong danh sách (bắt đầu từ 0)
+        image_path (str): Đường dẫn file ảnh
+        language (str): Ngôn ngữ nhận dạng
+        config (str): Cấu hình Tesseract
+        backend (str): Tên backend OCR
+        preprocessor (ImagePreprocessor): Bộ tiền xử lý ảnh (None = OCR ảnh gốc)
+        with_confidence (bool): Lấy thêm độ tin cậy trung bình của trang
+        page (int): Số trang trong PDF (None = index + 1)
+        blank_detector (BlankPageDetector): Bỏ qua OCR trang trắng (None = OCR mọi trang)
+
+    Returns:
+        tuple: (index, bản ghi trang, pid, lỗi hoặc None)
+    """
+    start = time.perf_counter()
+    confidence = None
+    layout = None
+    try:
+        if blank_detector is not None:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                layout = blank_detector.classify(img)
+            if layout == 'blank':
+                record = make_page_record(page or index + 1, "", time.perf_counter() - start,
+                                          source='blank', layout=layout)
+                return index, record, os.getpid(), None
+        engine = get_backend(backend, language, config)
+        if preprocessor is None:
+            text, confidence = engine.recognize_file(image_path, with_confidence)
+        else:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                processed, _ = preprocessor.process(img)
+            text, confidence = engine.recognize_image(processed, with_confidence)
+        error = None
+    except Exception as e:
+        text = ""
+        error = str(e)
+    record = make_page_record(page or index + 1, text, time.perf_counter() - start, confidence,
+                              layout=layout)
+    return index, record, os.getpid(), error
+
 
 class OCRExtractor:
-    def __init__(self, language='vie', config='--psm 6'):
+    def __init__(self, language='vie', config='--psm 6', workers=1, cache=None, journal=None,
+                 profiler=None, backend='pytesseract', preprocessor=None, with_confidence=False,
+                 blank_detector=None):
         """
         Khởi tạo OCR extractor
         
         Args:
             language (str): Ngôn ngữ nhận dạng ('vie' cho tiếng Việt)
             config (str): Cấu hình Tesseract
+            workers (int): Số tiến trình OCR song song (None = số CPU)
+            cache (OCRCache): Cache kết quả OCR theo trang (None = không dùng)
+            journal (OCRJournal): Journal checkpoint để chạy tiếp (None = không dùng)
+            profiler (StageProfiler): Ghi thời gian OCR từng trang (None = không ghi)
+            backend (str): 'pytesseract' hoặc 'tesserocr' (engine dùng lại, nhanh hơn)
+            preprocessor (ImagePreprocessor): Tiền xử lý ảnh trước OCR (None = không dùng)
+            with_confidence (bool): Ghi độ tin cậy trung bình của Tesseract cho từng trang
+            blank_detector (BlankPageDetector): Bỏ qua OCR trang trắng, đánh dấu trang
+                                                chỉ có hình (None = không kiểm tra)
         """
         self.language = language
         self.config = config
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.journal = journal
+        self.profiler = profiler or StageProfiler(enabled=False)
+        self.preprocessor = preprocessor
+        self.with_confidence = with_confidence
+        self.blank_detector = blank_detector
+        self._cache_keys = {}
+        self._page_numbers = []
+        
+        # Kết quả OCR phụ thuộc cả cấu hình tiền xử lý nên đưa vào khóa cache
+        self.cache_config = config
+        if preprocessor is not None:
+            self.cache_config = f"{config}|{preprocessor.signature()}"
         
         # Kiểm tra xem Tesseract có hoạt động không
+        self.engine = get_backend(backend, language, config)
+        self.backend = self.engine.name
+        logger.info(f"OCR backend: {self.backend}")
         self._verify_tesseract()
         
     def _verify_tesseract(self):
         """Kiểm tra Tesseract có hoạt động không"""
         try:
-            version = pytesseract.get_tesseract_version()
-            logger.info(f"Tesseract version: {version}")
-            
             # Kiểm tra ngôn ngữ
-            langs = pytesseract.get_languages()
+            langs = self.engine.verify()
             logger.info(f"Available languages: {langs}")
             
             if self.language not in langs:
@@ -43,12 +141,12 @@ class OCRExtractor:
                 
         except Exception as e:
             logger.error(f"Cannot verify Tesseract: {str(e)}")
-            raise Exception(
-                "Tesseract not found! Please check:\n"
-                f"1. Tesseract installed at: {pytesseract.pytesseract.tesseract_cmd}\n"
-                "2. PATH environment variable is set correctly"
-            )
+            raise Exception(self.engine.describe_missing())
         
+    def _engine(self):
+        """Engine OCR của luồng hiện tại (mỗi luồng OCR của fused pipeline có engine riêng)"""
+        return get_backend(self.backend, self.language, self.config)
+    
     def extract_from_image(self, image_path):
         """
         Trích xuất văn bản từ một ảnh
@@ -59,17 +157,77 @@ class OCRExtractor:
         Returns:
             str: Văn bản trích xuất được
         """
+        _, record, _, error = _ocr_page_worker(0, image_path, self.language, self.config,
+                                               self.backend, self.preprocessor,
+                                               blank_detector=self.blank_detector)
+        if error:
+            logger.error(f"Lỗi OCR cho file {image_path}: {error}")
+        return record['text']
+    
+    def extract_from_pil_image(self, img, page_label="", index=None):
+        """
+        Trích xuất văn bản từ ảnh PIL đã có trong bộ nhớ (không đọc file)
+        
+        Args:
+            img (PIL.Image.Image): Ảnh trang
+            page_label (str): Nhãn trang dùng khi ghi log lỗi
+            index (int): Vị trí trang để ghi checkpoint (None = không ghi)
+            
+        Returns:
+            str: Văn bản trích xuất được
+        """
+        page = index + 1 if index is not None else 0
+        return self.ocr_pil_page(img, page, page_label)['text']
+    
+    def ocr_pil_page(self, img, page, page_label=""):
+        """
+        OCR một trang từ ảnh PIL, dùng cache và ghi checkpoint
+        
+        Args:
+            img (PIL.Image.Image): Ảnh trang
+            page (int): Số trang (bắt đầu từ 1, 0 = không ghi checkpoint)
+            page_label (str): Nhãn trang dùng khi ghi log lỗi
+            
+        Returns:
+            dict: Bản ghi trang
+        """
+        layout = None
+        if self.blank_detector is not None:
+            # Kiểm tra trước khi băm ảnh cho cache: trang trắng không cần cả hai
+            layout = self.blank_detector.classify(img)
+            if layout == 'blank':
+                record = make_page_record(page, "", source='blank', layout=layout)
+                if self.journal and page:
+                    self.journal.record(record)
+                return record
+        
+        key = None
+        if self.cache:
+            key = self.cache.make_key(self.cache.image_bytes(img), self.language, self.cache_config)
+            text = self.cache.get(key)
+            if text is not None:
+                confidence = self.cache.confidence(key) if self.with_confidence else None
+                return make_page_record(page, text, confidence=confidence, source='cache',
+                                        layout=layout)
+        
+        start = time.perf_counter()
         try:
-            img = Image.open(image_path)
-            text = pytesseract.image_to_string(
-                img, 
-                lang=self.language,
-                config=self.config
-            )
-            return text
+            if self.preprocessor is not None:
+                img, _ = self.preprocessor.process(img)
+            text, confidence = self._engine().recognize_image(img, self.with_confidence)
         except Exception as e:
-            logger.error(f"Lỗi OCR cho file {image_path}: {str(e)}")
-            return ""
+            logger.error(f"Lỗi OCR cho {page_label or f'trang {page}'}: {str(e)}")
+            return make_page_record(page, "", source='error')
+        
+        record = make_page_record(page, text, time.perf_counter() - start, confidence,
+                                  layout=layout)
+        if page:
+            self.profiler.record_page(page, record['seconds'], len(text))
+        if key:
+            self.cache.put(key, text, confidence)
+        if self.journal and page:
+            self.journal.record(record)
+        return record
     
     def extract_from_images(self, image_paths):
         """
@@ -81,19 +239,191 @@ class OCRExtractor:
         Returns:
             str: Toàn bộ văn bản trích xuất
         """
-        logger.info(f"Bắt đầu OCR cho {len(image_paths)} ảnh")
+        return self.join_pages(self.extract_pages(image_paths))
+    
+    def extract_pages(self, image_paths, page_numbers=None):
+        """
+        Trích xuất văn bản từ nhiều ảnh, giữ nguyên ranh giới trang
         
-        full_text = ""
-        for i, image_path in enumerate(image_paths, start=1):
-            logger.info(f"Đang xử lý trang {i}/{len(image_paths)}")
+        Args:
+            image_paths (list): Danh sách đường dẫn ảnh theo thứ tự trang
+            page_numbers (list): Số trang trong PDF của từng ảnh (None = 1, 2, 3...)
             
-            page_text = self.extract_from_image(image_path)
+        Returns:
+            list: Bản ghi từng trang (kể cả trang trống) theo thứ tự
+        """
+        logger.info(f"Bắt đầu OCR cho {len(image_paths)} ảnh")
+        
+        if page_numbers is None:
+            page_numbers = range(1, len(image_paths) + 1)
+        self._page_numbers = list(page_numbers)
+        positions = {page: index for index, page in enumerate(self._page_numbers)}
+        
+        records = [None] * len(image_paths)
+        if self.journal:
+            for index, record in self.journal.load().items():
+                position = positions.get(index + 1)
+                if position is not None:
+                    records[position] = dict(record, source='checkpoint')
+        
+        self._cache_keys = {}
+        if self.cache:
+            for index, image_path in enumerate(image_paths):
+                if records[index] is not None:
+                    continue
+                try:
+                    with open(image_path, 'rb') as f:
+                        self._cache_keys[index] = self.cache.make_key(f.read(), self.language,
+                                                                      self.cache_config)
+                except OSError:
+                    # Để bước OCR ghi nhận lỗi của trang này
+                    continue
+                key = self._cache_keys[index]
+                text = self.cache.get(key)
+                if text is not None:
+                    confidence = self.cache.confidence(key) if self.with_confidence else None
+                    records[index] = make_page_record(self._page_numbers[index], text,
+                                                      confidence=confidence, source='cache')
+        
+        pending = [(index, image_paths[index])
+                   for index, record in enumerate(records) if record is None]
+        if len(pending) < len(image_paths):
+            logger.info(f"{len(image_paths) - len(pending)}/{len(image_paths)} "
+                        f"trang đã có sẵn, cần OCR {len(pending)} trang")
+        
+        if self.workers > 1 and len(pending) > 1:
+            results = self._extract_parallel(pending)
+        else:
+            results = self._extract_serial(pending)
+        
+        for index, record in results.items():
+            records[index] = record
+        return records
+    
+    def _store_result(self, index, record, error):
+        """
+        Lưu kết quả một trang vừa OCR vào cache và journal (bỏ qua trang lỗi
+        để lần chạy sau thử lại). Trang trắng không vào cache: khóa cache không gồm
+        ngưỡng của BlankPageDetector nên đổi ngưỡng hoặc tắt kiểm tra thì trang phải được OCR
+        
+        Args:
+            index (int): Vị trí trang
+            record (dict): Bản ghi trang
+            error (str): Lỗi khi OCR, None nếu thành công
+        """
+        if error is not None:
+            return
+        if self.cache and index in self._cache_keys and record['source'] != 'blank':
+            self.cache.put(self._cache_keys[index], record['text'], record['confidence'])
+        if self.journal:
+            self.journal.record(record)
+    
+    def join_pages(self, records):
+        """
+        Ghép văn bản các trang thành một chuỗi, bỏ qua trang rỗng
+        
+        Args:
+            records (list): Bản ghi từng trang theo thứ tự
             
+        Returns:
+            str: Toàn bộ văn bản trích xuất
+        """
+        parts = []
+        for record in records:
+            page_text = record['text']
             if page_text.strip():  # Chỉ thêm nếu có nội dung
-                full_text += page_text + "\n\n"
-                logger.info(f"Trang {i}: Trích xuất được {len(page_text)} ký tự")
+                parts.append(page_text)
+                parts.append("\n\n")
+                logger.info(f"Trang {record['page']}: Trích xuất được {len(page_text)} ký tự")
+            elif record.get('source') == 'blank':
+                logger.info(f"Trang {record['page']}: Trang trắng, bỏ qua OCR")
             else:
-                logger.warning(f"Trang {i}: Không trích xuất được văn bản")
+                logger.warning(f"Trang {record['page']}: Không trích xuất được văn bản")
         
+        full_text = ''.join(parts)
         logger.info(f"Hoàn thành OCR. Tổng {len(full_text)} ký tự")
-        return full_text
\ No newline at end of file
+        return full_text
+    
+    def _extract_serial(self, pages):
+        """
+        OCR lần lượt từng ảnh trong tiến trình hiện tại
+        
+        Args:
+            pages (list): Danh sách (vị trí trang, đường dẫn ảnh)
+            
+        Returns:
+            dict: {vị trí trang: bản ghi trang}
+        """
+        results = {}
+        for i, (index, image_path) in enumerate(pages, start=1):
+            page = self._page_numbers[index]
+            logger.info(f"Đang xử lý trang {page} ({i}/{len(pages)})")
+            _, record, _, error = _ocr_page_worker(index, image_path, self.language, self.config,
+                                                   self.backend, self.preprocessor,
+                                                   self.with_confidence, page,
+                                                   self.blank_detector)
+            if error:
+                logger.error(f"Lỗi OCR cho file {image_path}: {error}")
+                record['source'] = 'error'
+            self.profiler.record_page(page, record['seconds'], record['chars'])
+            results[index] = record
+            self._store_result(index, record, error)
+        return results
+    
+    def _extract_parallel(self, pages):
+        """
+        OCR song song bằng process pool. Kết quả được trả theo vị trí trang,
+        trang lỗi trả về chuỗi rỗng thay vì dừng cả lô.
+        
+        Args:
+            pages (list): Danh sách (vị trí trang, đường dẫn ảnh)
+            
+        Returns:
+            dict: {vị trí trang: bản ghi trang}
+        """
+        workers = min(self.workers, len(pages))
+        logger.info(f"OCR song song với {workers} tiến trình")
+        
+        results = {}
+        worker_stats = {}  # pid -> [số trang, tổng thời gian]
+        start = time.perf_counter()
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_ocr_page_worker, index, image_path,
+                                self.language, self.config, self.backend,
+                                self.preprocessor, self.with_confidence,
+                                self._page_numbers[index],
+                                self.blank_detector): (index, image_path)
+                for index, image_path in pages
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                index, image_path = futures[future]
+                page = self._page_numbers[index]
+                try:
+                    _, record, pid, error = future.result()
+                except Exception as e:
+                    # Tiến trình con bị lỗi hoặc bị dừng đột ngột
+                    logger.error(f"Lỗi OCR cho file {image_path}: {str(e)}")
+                    results[index] = make_page_record(page, "", source='error')
+                    continue
+                
+                if error:
+                    logger.error(f"Lỗi OCR cho file {image_path}: {error}")
+                    record['source'] = 'error'
+                results[index] = record
+                self._store_result(index, record, error)
+                self.profiler.record_page(page, record['seconds'], record['chars'])
+                stats = worker_stats.setdefault(pid, [0, 0.0])
+                stats[0] += 1
+                stats[1] += record['seconds']
+                logger.info(f"Đã xử lý {done}/{len(pages)} trang (trang {page})")
+        
+        total = time.perf_counter() - start
+        for pid, (count, busy) in sorted(worker_stats.items()):
+            rate = count / busy if busy > 0 else 0.0
+            logger.info(f"Tiến trình {pid}: {count} trang, {rate:.2f} trang/giây")
+        if total > 0:
+            logger.info(f"Tốc độ OCR tổng: {len(pages) / total:.2f} trang/giây")
+        
+        return results
@@ -0,0 +1,236 @@
+"""
+Module làm sạch và phân đoạn văn bản lớn song song trên nhiều tiến trình: văn bản
+được cắt tại ranh giới dòng/đoạn an toàn, kết quả ghép lại giống hệt khi chạy tuần tự
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from src.utils import setup_logging
+from src.text_cleaner import TextCleaner
+from src.text_segmenter import TextSegmenter
+
+logger = setup_logging()
+
+# Các dòng trống giữa hai đoạn, cắt ngay sau ký tự '\n' cuối cùng: câu và đoạn không
+# bao giờ vắt qua ranh giới này, khoảng trắng đầu dòng tiếp theo vẫn được giữ
+# để kiểm tra "số thứ tự đầu dòng" của TextSegmenter cho kết quả như khi chạy tuần tự
+_BLANK_RUN_REGEX = re.compile(r'\n[ \t]*\n(?:[ \t]*\n)*')
+
+# Đối tượng xử lý của từng tiến trình con, tạo một lần trong _init_worker
+_cleaner = None
+_segmenter = None
+
+def _init_worker(config, cleaning):
+    """Tạo TextCleaner (cleaning=True) hoặc TextSegmenter một lần cho mỗi tiến trình con"""
+    global _cleaner, _segmenter
+    if cleaning:
+        _cleaner = TextCleaner(config)
+        return
+    _segmenter = TextSegmenter(
+        method=config['segmentation']['method'],
+        min_length=config['segmentation']['min_sentence_length'],
+        abbreviations=config['segmentation'].get('abbreviations')
+    )
+
+def _clean_worker(block):
+    return _cleaner.clean_block(block)
+
+def _clean_pages_worker(item):
+    block, page_marks = item
+    return _cleaner.clean_block(block, page_marks)
+
+def _spans_worker(item):
+    offset, chunk = item
+    return [(start + offset, end + offset) for start, end in _segmenter.iter_spans(chunk)]
+
+def split_lines(text, chunk_size):
+    """
+    Cắt văn bản gốc thành các khối dòng khoảng chunk_size ký tự, ưu tiên cắt tại dòng trống.
+    '\\n'.join(khối) bằng đúng text
+
+    Args:
+        text (str): Văn bản gốc
+        chunk_size (int): Số ký tự mỗi khối (xấp xỉ)
+
+    Returns:
+        list: Các khối dòng
+    """
+    blocks = []
+    start = 0
+    while len(text) - start > chunk_size:
+        target = start + chunk_size
+        cut = text.find('\n\n', target, target + chunk_size // 4)
+        if cut == -1:
+            cut = text.find('\n', target)
+            if cut == -1:
+                break
+        blocks.append(text[start:cut])
+        start = cut + 1
+    blocks.append(text[start:])
+    return blocks
+
+def split_pages(records, chunk_size):
+    """
+    Nối các trang như TextCleaner.clean_pages rồi cắt tại đầu trang thành các khối dòng
+    khoảng chunk_size ký tự. '\\n'.join(khối) bằng đúng văn bản gốc của các trang
+
+    Args:
+        records (iterable): Bản ghi trang có khóa 'page' và 'text'
+        chunk_size (int): Số ký tự mỗi khối (xấp xỉ)
+
+    Returns:
+        list: (khối dòng, [(số thứ tự dòng trong khối, số trang) tại đầu mỗi trang])
+    """
+    blocks = []
+    parts = []
+    page_marks = []
+    line_no = 0
+    size = 0
+    for record in records:
+        text = record['text']
+        if not text.strip():
+            continue
+        page_marks.append((line_no, record['page']))
+        parts.append(text)
+        parts.append('\n\n')
+        line_no += text.count('\n') + 2
+        size += len(text) + 2
+        if size >= chunk_size:
+            # Mỗi trang kết thúc bằng '\n\n': cắt tại ký tự '\n' cuối, bỏ ký tự đó
+            blocks.append((''.join(parts)[:-1], page_marks))
+            parts = []
+            page_marks = []
+            line_no = 0
+            size = 0
+    blocks.append((''.join(parts), page_marks))
+    return blocks
+
+def split_paragraphs(text, chunk_size):
+    """
+    Cắt văn bản sạch sau các dòng trống, mỗi phần khoảng chunk_size ký tự
+
+    Args:
+        text (str): Văn bản sạch
+        chunk_size (int): Số ký tự mỗi phần (xấp xỉ)
+
+    Returns:
+        list: (vị trí bắt đầu, phần văn bản)
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > chunk_size:
+        match = _BLANK_RUN_REGEX.search(text, start + chunk_size)
+        if match is None:
+            break
+        chunks.append((start, text[start:match.end()]))
+        start = match.end()
+    chunks.append((start, text[start:]))
+    return chunks
+
+class ParallelTextProcessor:
+    def __init__(self, config, workers=None, chunk_size=4 * 1024 * 1024):
+        """
+        Khởi tạo bộ xử lý song song
+
+        Args:
+            config (dict): Cấu hình từ config.yaml (dùng để tạo TextCleaner/TextSegmenter
+                           trong từng tiến trình con)
+            workers (int): Số tiến trình (None = số CPU)
+            chunk_size (int): Số ký tự mỗi khối giao cho một tiến trình
+        """
+        self.config = config
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+
+    def _map(self, func, items):
+        """Chạy func trên từng khối trong process pool, giữ thứ tự khối"""
+        workers = min(self.workers, len(items))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.config, func is not _spans_worker)) as executor:
+            return list(executor.map(func, items))
+
+    def clean(self, text, cleaner):
+        """
+        Làm sạch văn bản song song, kết quả giống hệt cleaner.clean(text)
+
+        Args:
+            text (str): Văn bản gốc
+            cleaner (TextCleaner): Bộ làm sạch của tiến trình chính (ghép kết quả, cộng dồn
+                                   số dòng bị loại và số lỗi OCR đã sửa)
+
+        Returns:
+            str: Văn bản đã làm sạch
+        """
+        blocks = split_lines(text, self.chunk_size)
+        if len(blocks) == 1 or self.workers == 1:
+            return cleaner.clean(text)
+
+        logger.info(f"=== BẮT ĐẦU LÀM SẠCH VĂN BẢN SONG SONG "
+                    f"({len(blocks)} khối, {min(self.workers, len(blocks))} tiến trình) ===")
+        # Các bước con chạy trong tiến trình con nên chỉ đo chung một bước
+        with cleaner.profiler.stage('cleaning.parallel') as record:
+            clean_text = ''.join(cleaner.join_blocks(self._map(_clean_worker, blocks)))
+            record['items'] = text.count('\n') + 1
+            record['chars'] = len(text)
+        return self._log_clean(clean_text, cleaner)
+
+    def clean_pages(self, records, cleaner):
+        """
+        Làm sạch song song từ kết quả OCR theo trang, cắt khối tại đầu trang. Kết quả và
+        cleaner.page_offsets giống hệt ''.join(cleaner.clean_pages(records))
+
+        Args:
+            records (iterable): Bản ghi trang có khóa 'page' và 'text'
+            cleaner (TextCleaner): Bộ làm sạch của tiến trình chính
+
+        Returns:
+            str: Văn bản đã làm sạch
+        """
+        blocks = split_pages(records, self.chunk_size)
+        if len(blocks) == 1 or self.workers == 1:
+            logger.info("=== BẮT ĐẦU LÀM SẠCH VĂN BẢN THEO TRANG ===")
+            stage = 'cleaning.by_pages'
+            results = (cleaner.clean_block(*block) for block in blocks)
+        else:
+            logger.info(f"=== BẮT ĐẦU LÀM SẠCH VĂN BẢN SONG SONG THEO TRANG "
+                        f"({len(blocks)} khối, {min(self.workers, len(blocks))} tiến trình) ===")
+            stage = 'cleaning.parallel'
+            results = self._map(_clean_pages_worker, blocks)
+        with cleaner.profiler.stage(stage) as record:
+            clean_text = ''.join(cleaner.join_blocks(results))
+            record['items'] = sum(len(page_marks) for _, page_marks in blocks)
+            record['chars'] = sum(len(text) for text, _ in blocks)
+        return self._log_clean(clean_text, cleaner)
+
+    @staticmethod
+    def _log_clean(clean_text, cleaner):
+        """Ghi log số dòng bị loại, số lỗi OCR đã sửa và độ dài văn bản sạch"""
+        for pattern, count in zip(cleaner.remove_patterns, cleaner.pattern_counts):
+            if count:
+                logger.info(f"  Pattern {pattern!r}: loại bỏ {count} dòng")
+        if cleaner.corrector is not None:
+            logger.info(f"  Đã sửa {cleaner.corrector.corrections} lỗi OCR")
+        logger.info("=== HOÀN THÀNH LÀM SẠCH VĂN BẢN ===")
+        logger.info(f"Độ dài văn bản sau khi làm sạch: {len(clean_text)} ký tự")
+        return clean_text
+
+    def iter_spans(self, text, segmenter):
+        """
+        Phân đoạn song song, kết quả giống hệt segmenter.iter_spans(text)
+
+        Args:
+            text (str): Văn bản sạch
+            segmenter (TextSegmenter): Bộ phân đoạn dùng khi văn bản chỉ có một phần
+
+        Yields:
+            tuple: (start, end) của từng đoạn trong text
+        """
+        chunks = split_paragraphs(text, self.chunk_size)
+        if len(chunks) == 1 or self.workers == 1:
+            yield from segmenter.iter_spans(text)
+            return
+
+        logger.info(f"Phân đoạn song song: {len(chunks)} phần, "
+                    f"{min(self.workers, len(chunks))} tiến trình")
+        for spans in self._map(_spans_worker, chunks):
+            yield from spans
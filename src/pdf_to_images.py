@@ -1,29 +1,131 @@
 """
 Module chuyển đổi PDF sang ảnh
 """
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import os
+import re
 from src.utils import setup_logging
 
 logger = setup_logging()
 
 class PDFToImageConverter:
-    def __init__(self, dpi=300):
+    def __init__(self, dpi=300, chunk_size=10, max_memory_mb=None):
         """
         Khởi tạo converter
         
         Args:
             dpi (int): Độ phân giải ảnh (300 DPI khuyến nghị cho OCR)
+            chunk_size (int): Số trang chuyển đổi mỗi lần
+            max_memory_mb (int): Giới hạn bộ nhớ cho một lô trang (None = không giới hạn)
         """
         self.dpi = dpi
+        self.chunk_size = max(1, chunk_size or 1)
+        self.max_memory_mb = max_memory_mb
         
-    def convert(self, pdf_path, output_dir):
+    def get_page_info(self, pdf_path):
+        """
+        Đọc số trang và kích thước trang của PDF (không render)
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            
+        Returns:
+            tuple: (số trang, số byte ước tính của một trang ảnh RGB)
+        """
+        info = pdfinfo_from_path(pdf_path)
+        num_pages = int(info['Pages'])
+        
+        # "Page size": "595.276 x 841.89 pts (A4)"
+        page_bytes = None
+        match = re.match(r'\s*([\d.]+)\s*x\s*([\d.]+)', str(info.get('Page size', '')))
+        if match:
+            width = float(match.group(1)) / 72 * self.dpi
+            height = float(match.group(2)) / 72 * self.dpi
+            page_bytes = int(width * height * 3)
+        return num_pages, page_bytes
+    
+    def _effective_chunk_size(self, page_bytes):
+        """
+        Tính số trang mỗi lô sao cho không vượt giới hạn bộ nhớ
+        
+        Args:
+            page_bytes (int): Số byte ước tính của một trang (None nếu không rõ)
+            
+        Returns:
+            int: Số trang mỗi lô
+        """
+        if not self.max_memory_mb or not page_bytes:
+            return self.chunk_size
+        
+        limit = self.max_memory_mb * 1024 * 1024
+        pages_fit = limit // page_bytes
+        if pages_fit < 1:
+            logger.warning(
+                f"Một trang ({page_bytes / 1024 / 1024:.0f} MB) vượt giới hạn "
+                f"{self.max_memory_mb} MB, chuyển đổi từng trang một"
+            )
+            return 1
+        return max(1, min(self.chunk_size, pages_fit))
+    
+    @staticmethod
+    def _page_ranges(page_numbers, chunk_size):
+        """
+        Gom các số trang thành các khoảng liên tiếp, mỗi khoảng tối đa chunk_size trang
+        
+        Args:
+            page_numbers (list): Các số trang (bắt đầu từ 1)
+            chunk_size (int): Số trang tối đa mỗi khoảng
+            
+        Returns:
+            list: Danh sách (first_page, last_page)
+        """
+        ranges = []
+        for number in sorted(set(page_numbers)):
+            if ranges and number == ranges[-1][1] + 1 and number - ranges[-1][0] < chunk_size:
+                ranges[-1][1] = number
+            else:
+                ranges.append([number, number])
+        return [tuple(r) for r in ranges]
+    
+    def iter_pages(self, pdf_path, page_numbers=None):
+        """
+        Render PDF theo từng lô trang, chỉ giữ một lô trong bộ nhớ
+        
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+            page_numbers (list): Chỉ render các trang này (None = tất cả)
+            
+        Yields:
+            tuple: (số thứ tự trang, ảnh PIL) - bên gọi chịu trách nhiệm close() ảnh
+        """
+        num_pages, page_bytes = self.get_page_info(pdf_path)
+        chunk_size = self._effective_chunk_size(page_bytes)
+        logger.info(f"Tổng số trang: {num_pages}, {chunk_size} trang mỗi lô")
+        
+        if page_numbers is None:
+            page_numbers = range(1, num_pages + 1)
+        page_numbers = [n for n in page_numbers if 1 <= n <= num_pages]
+        
+        for first_page, last_page in self._page_ranges(page_numbers, chunk_size):
+            pages = convert_from_path(
+                pdf_path,
+                dpi=self.dpi,
+                first_page=first_page,
+                last_page=last_page
+            )
+            for offset, page in enumerate(pages):
+                yield first_page + offset, page
+            # Giải phóng lô hiện tại trước khi render lô tiếp theo
+            del pages
+        
+    def convert(self, pdf_path, output_dir, page_numbers=None):
         """
         Chuyển đổi PDF sang ảnh
         
         Args:
             pdf_path (str): Đường dẫn file PDF
             output_dir (str): Thư mục lưu ảnh
+            page_numbers (list): Chỉ chuyển đổi các trang này (None = tất cả)
             
         Returns:
             list: Danh sách đường dẫn các file ảnh
@@ -32,18 +134,15 @@ class PDFToImageConverter:
         logger.info(f"DPI: {self.dpi}")
         
         try:
-            # Chuyển PDF sang ảnh
-            pages = convert_from_path(pdf_path, dpi=self.dpi)
-            logger.info(f"Tổng số trang: {len(pages)}")
-            
             # Tạo thư mục output nếu chưa có
             os.makedirs(output_dir, exist_ok=True)
             
-            # Lưu từng trang
+            # Render và lưu từng lô trang
             image_paths = []
-            for i, page in enumerate(pages, start=1):
+            for i, page in self.iter_pages(pdf_path, page_numbers):
                 image_path = os.path.join(output_dir, f"page_{i}.png")
                 page.save(image_path, "PNG")
+                page.close()
                 image_paths.append(image_path)
                 logger.info(f"Đã lưu trang {i}: {image_path}")
             
@@ -52,4 +151,4 @@ class PDFToImageConverter:
             
         except Exception as e:
             logger.error(f"Lỗi khi chuyển đổi PDF: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,578 @@
+"""
+Module điều phối các bước xử lý (PDF -> ảnh -> OCR -> làm sạch -> phân đoạn)
+cho một cuốn sách
+"""
+import os
+from src.utils import setup_logging, save_text, save_pages, load_pages, list_page_images
+from src.profiler import StageProfiler
+from src.pipeline_context import PipelineContext
+from src.stage_graph import Stage, StageGraph
+
+# Các module của từng bước (pdf2image, pytesseract, PIL...) được import trễ
+# bên trong run_pipeline, chỉ khi bước đó thực sự chạy, để lần chạy chỉ
+# làm sạch/phân đoạn khởi động nhanh và không cần cài thư viện OCR
+
+logger = setup_logging()
+
+def first_pass_dpi(config):
+    """DPI render trang cho lượt OCR đầu tiên (thấp hơn ocr.dpi khi bật OCR hai tầng)"""
+    adaptive_config = config.get('adaptive_ocr', {})
+    if adaptive_config.get('enabled', False):
+        return adaptive_config.get('fast_dpi', 150)
+    return config['ocr']['dpi']
+
+def segment_output_format(config):
+    """
+    Định dạng file đoạn: dedup.mode 'tag' cần JSONL để ghi trường duplicate_of
+    
+    Args:
+        config (dict): Cấu hình từ config.yaml
+        
+    Returns:
+        str: 'text' hoặc 'jsonl'
+    """
+    segment_format = config['segmentation'].get('output_format', 'text')
+    dedup_config = config.get('dedup', {})
+    if dedup_config.get('enabled', False) and dedup_config.get('mode', 'tag') == 'tag':
+        return 'jsonl'
+    return segment_format
+
+def build_stages(config, fused=False):
+    """
+    Khai báo các bước của pipeline cùng đầu vào, kết quả và phần cấu hình liên quan
+    
+    Args:
+        config (dict): Cấu hình từ config.yaml
+        fused (bool): Gộp chuyển PDF sang ảnh vào bước OCR
+        
+    Returns:
+        list: Các Stage theo thứ tự chạy
+    """
+    paths = config['paths']
+    stages = []
+    ocr_config = {key: value for key, value in config['ocr'].items() if key != 'workers'}
+    text_layer = config.get('text_layer', {})
+    dedup_config = config.get('dedup', {})
+    if not dedup_config.get('enabled', False):
+        dedup_config = {}
+    # Trang có lớp văn bản được đọc thẳng từ PDF, không qua ảnh
+    ocr_inputs = [paths['input_pdf']]
+    if not fused:
+        stages.append(Stage(
+            'pdf_to_images',
+            inputs=[paths['input_pdf']],
+            outputs=[paths['output_images']],
+            config={'dpi': first_pass_dpi(config), 'text_layer': text_layer}
+        ))
+        ocr_inputs = [paths['output_images'],
+                      paths['input_pdf'] if text_layer.get('enabled') else None]
+    stages.append(Stage(
+        'ocr',
+        inputs=ocr_inputs,
+        outputs=[paths['raw_text']],
+        optional_outputs=[paths.get('pages')],
+        config={'ocr': ocr_config, 'preprocessing': config.get('preprocessing', {}),
+                'text_layer': text_layer, 'blank_pages': config.get('blank_pages', {}),
+                'adaptive_ocr': config.get('adaptive_ocr', {}),
+                'dedup': dedup_config if dedup_config.get('pages') else None},
+        depends=[] if fused else ['pdf_to_images']
+    ))
+    corrections = config['cleaning'].get('corrections', {})
+    stages.append(Stage(
+        'cleaning',
+        inputs=[paths['raw_text'], paths.get('pages'),
+                corrections.get('dictionary') if corrections.get('enabled') else None],
+        outputs=[paths['clean_text']],
+        optional_outputs=[os.path.splitext(paths['clean_text'])[0] + '.pages.json'],
+        config={'cleaning': config['cleaning'],
+                'segment_format': segment_output_format(config)},
+        depends=['ocr']
+    ))
+    stages.append(Stage(
+        'segmentation',
+        inputs=[paths['clean_text']],
+        outputs=[paths['segments']],
+        optional_outputs=[paths.get('segments_index')],
+        config={'segmentation': config['segmentation'], 'dedup': dedup_config},
+        depends=['cleaning']
+    ))
+    return stages
+
+def _build_adaptive_ocr(config, ocr, preprocessor):
+    """
+    Tạo bộ nâng cấp OCR: render lại ở ocr.dpi, thử lần lượt các cấu hình Tesseract
+    
+    Args:
+        config (dict): Cấu hình từ config.yaml
+        ocr (OCRExtractor): Bộ OCR của lượt nhanh (dùng chung ngôn ngữ, backend, cache)
+        preprocessor (ImagePreprocessor): Tiền xử lý của lượt nhanh (None = không dùng)
+        
+    Returns:
+        AdaptiveOCR: Bộ nâng cấp
+    """
+    import copy
+    from src.adaptive_ocr import AdaptiveOCR
+    from src.ocr_extraction import OCRExtractor
+    from src.pdf_to_images import PDFToImageConverter
+    
+    adaptive_config = config['adaptive_ocr']
+    pdf_config = config.get('pdf_conversion', {})
+    high_dpi = config['ocr']['dpi']
+    converter = PDFToImageConverter(
+        dpi=high_dpi,
+        chunk_size=pdf_config.get('chunk_size', 10),
+        max_memory_mb=pdf_config.get('max_memory_mb')
+    )
+    if preprocessor is not None:
+        preprocessor = copy.copy(preprocessor)
+        preprocessor.source_dpi = high_dpi
+    
+    extractors = [
+        OCRExtractor(
+            language=ocr.language,
+            config=tesseract_config,
+            workers=ocr.workers,
+            cache=ocr.cache,
+            backend=ocr.backend,
+            preprocessor=preprocessor,
+            with_confidence=True
+        )
+        for tesseract_config in (adaptive_config.get('retry_configs')
+                                 or [config['ocr']['tesseract_config']])
+    ]
+    return AdaptiveOCR(
+        converter,
+        extractors,
+        min_confidence=adaptive_config.get('min_confidence', 75),
+        queue_size=config.get('fused_pipeline', {}).get('queue_size', 4)
+    )
+
+def _open_dedup_index(config):
+    """
+    Mở chỉ mục trùng lặp dùng chung cho cả kho sách
+    
+    Args:
+        config (dict): Cấu hình từ config.yaml
+        
+    Returns:
+        tuple: (DuplicateIndex, tên sách = tên file PDF không có đuôi)
+    """
+    from src.segment_dedup import DuplicateIndex
+    dedup_config = config['dedup']
+    index = DuplicateIndex(
+        dedup_config.get('index', 'output/dedup_index.sqlite'),
+        num_perm=dedup_config.get('num_perm', 64),
+        bands=dedup_config.get('bands', 8),
+        threshold=dedup_config.get('threshold', 0.8),
+        shingle_size=dedup_config.get('shingle_size', 5),
+        min_chars=dedup_config.get('min_chars', 50)
+    )
+    book = os.path.splitext(os.path.basename(config['paths']['input_pdf']))[0]
+    return index, book
+
+def run_pipeline(config):
+    """
+    Chạy bước 2-5 của pipeline theo cấu hình
+    
+    Args:
+        config (dict): Cấu hình từ config.yaml
+        
+    Returns:
+        int: 0 nếu thành công
+    """
+    segment_format = segment_output_format(config)
+    if segment_format != config['segmentation'].get('output_format', 'text'):
+        # Đổi đuôi file đoạn như batch_processor (segments.jsonl), không sửa cấu hình bên gọi
+        segments = config['paths']['segments']
+        if not segments.endswith('.jsonl'):
+            segments = os.path.splitext(segments)[0] + '.jsonl'
+            config = dict(config, paths=dict(config['paths'], segments=segments))
+        logger.warning(f"⚠️  dedup.mode 'tag' cần segments dạng JSONL (trường duplicate_of), "
+                       f"ghi {segments} dạng JSONL thay vì "
+                       f"'{config['segmentation'].get('output_format', 'text')}'")
+    fused_config = config.get('fused_pipeline', {})
+    fused_enabled = fused_config.get('enabled', False)
+    
+    # Xác định các bước cần chạy: bước chỉ chạy lại khi đầu vào hoặc cấu hình
+    # của nó (hay của bước phía trước) thay đổi
+    exec_config = config.get('execution', {})
+    graph = StageGraph(exec_config.get('state_file', 'output/stages.json'),
+                       adopt_existing=exec_config.get('adopt_existing', False))
+    for stage in build_stages(config, fused_enabled):
+        graph.add(stage)
+    if exec_config.get('incremental', True):
+        to_run = graph.plan(exec_config.get('force') or [])
+    else:
+        to_run = list(graph.stages)
+    skip_pdf_to_images = 'pdf_to_images' not in to_run
+    skip_ocr = 'ocr' not in to_run
+    skip_cleaning = 'cleaning' not in to_run
+    skip_segmentation = 'segmentation' not in to_run
+    fused = fused_enabled and not skip_ocr
+    
+    # OCR hai tầng: lượt đầu render ở DPI thấp, chỉ trang có độ tin cậy thấp
+    # mới được render lại ở ocr.dpi và OCR lại
+    adaptive_config = config.get('adaptive_ocr', {})
+    adaptive_enabled = adaptive_config.get('enabled', False)
+    ocr_dpi = first_pass_dpi(config)
+    
+    # Phát hiện đoạn/trang trùng gần đúng với các sách đã xử lý (chỉ mục MinHash + LSH)
+    dedup_config = config.get('dedup', {})
+    dedup_enabled = dedup_config.get('enabled', False)
+    dedup_mode = dedup_config.get('mode', 'tag')
+    if dedup_mode not in ('tag', 'drop'):
+        logger.warning(f"Chế độ dedup không hợp lệ: {dedup_mode}. Sử dụng mặc định 'tag'")
+        dedup_mode = 'tag'
+    
+    profiling_config = config.get('profiling', {})
+    profiler = StageProfiler(
+        enabled=profiling_config.get('enabled', False),
+        track_memory=profiling_config.get('track_memory', False),
+        cprofile_dir=profiling_config.get('cprofile_dir')
+    )
+    
+    # Kết quả trung gian giữa các bước, file chỉ được đọc khi bước sau cần
+    context = PipelineContext(config)
+    
+    # Làm sạch/phân đoạn song song, kết quả giống hệt chạy tuần tự
+    parallel = None
+    parallel_config = config.get('parallel_text', {})
+    if parallel_config.get('enabled', False) and not (skip_cleaning and skip_segmentation):
+        from src.parallel_text import ParallelTextProcessor
+        parallel = ParallelTextProcessor(
+            config,
+            workers=parallel_config.get('workers'),
+            chunk_size=int(parallel_config.get('chunk_size_mb', 4) * 1024 * 1024)
+        )
+    
+    converter = None
+    if fused or not skip_pdf_to_images:
+        from src.pdf_to_images import PDFToImageConverter
+        pdf_config = config.get('pdf_conversion', {})
+        converter = PDFToImageConverter(
+            dpi=ocr_dpi,
+            chunk_size=pdf_config.get('chunk_size', 10),
+            max_memory_mb=pdf_config.get('max_memory_mb')
+        )
+    
+    # Trang đã có lớp văn bản (PDF dạng số) không cần render và OCR
+    text_pages = {}
+    image_pages = None
+    text_layer_config = config.get('text_layer', {})
+    if text_layer_config.get('enabled', False) and (fused or not skip_pdf_to_images or not skip_ocr):
+        from src.text_layer import TextLayerProbe
+        probe = TextLayerProbe(
+            min_chars=text_layer_config.get('min_chars', 50),
+            min_quality=text_layer_config.get('min_quality', 0.95),
+            command=text_layer_config.get('command', 'pdftotext')
+        )
+        with profiler.stage('text_layer') as record:
+            text_pages = probe.probe(config['paths']['input_pdf'])
+            record['items'] = len(text_pages)
+        if text_pages:
+            image_pages = [n for n in range(1, probe.num_pages + 1) if n not in text_pages]
+    
+    # Bước 2: Chuyển PDF sang ảnh
+    if fused:
+        logger.info("\n[BƯỚC 2] ⏩ Gộp với bước OCR (render trực tiếp trong bộ nhớ)")
+    elif skip_pdf_to_images:
+        logger.info("\n[BƯỚC 2] ⏭️  BỎ QUA - Chuyển đổi PDF sang ảnh (không thay đổi)")
+    else:
+        logger.info("\n[BƯỚC 2] 🔄 Chuyển đổi PDF sang ảnh...")
+        with profiler.stage('pdf_to_images') as record:
+            image_paths = converter.convert(
+                pdf_path=config['paths']['input_pdf'],
+                output_dir=config['paths']['output_images'],
+                page_numbers=image_pages
+            )
+            record['items'] = len(image_paths)
+        graph.mark_done('pdf_to_images')
+    
+    # Bước 3: OCR - Trích xuất văn bản
+    if skip_ocr:
+        logger.info("\n[BƯỚC 3] ⏭️  BỎ QUA - Trích xuất văn bản bằng OCR (không thay đổi)")
+        logger.info(f"  Sử dụng văn bản gốc có sẵn: {config['paths']['raw_text']}")
+    else:
+        logger.info("\n[BƯỚC 3] 🔄 Trích xuất văn bản bằng OCR...")
+        from src.ocr_extraction import OCRExtractor, make_page_record
+        from src.ocr_cache import OCRCache
+        from src.ocr_checkpoint import OCRJournal, make_fingerprint
+        
+        cache_config = config.get('ocr_cache', {})
+        ocr_cache = None
+        if cache_config.get('enabled', False):
+            ocr_cache = OCRCache(
+                cache_dir=cache_config.get('directory', 'output/ocr_cache'),
+                max_size_mb=cache_config.get('max_size_mb', 512)
+            )
+        
+        if not fused and image_pages is not None:
+            # Chỉ OCR ảnh của các trang không có lớp văn bản
+            image_paths = [os.path.join(config['paths']['output_images'], f"page_{n}.png")
+                           for n in image_pages]
+        elif not fused:
+            # Lấy danh sách ảnh theo thứ tự số trang
+            image_paths = list_page_images(config['paths']['output_images'])
+        
+        preprocessor = None
+        preprocessing_config = config.get('preprocessing', {})
+        if preprocessing_config.get('enabled', False):
+            from src.image_preprocessing import ImagePreprocessor
+            preprocessor = ImagePreprocessor(
+                mode=preprocessing_config.get('mode', 'binary'),
+                crop_margins=preprocessing_config.get('crop_margins', True),
+                margin=preprocessing_config.get('margin', 20),
+                target_line_height=preprocessing_config.get('target_line_height', 40),
+                source_dpi=ocr_dpi,
+                min_dpi=preprocessing_config.get('min_dpi', 150)
+            )
+        
+        # Phát hiện trang trắng trước khi OCR (rẻ hơn nhiều so với một lần chạy Tesseract)
+        blank_detector = None
+        blank_config = config.get('blank_pages', {})
+        if blank_config.get('enabled', False):
+            from src.blank_page_detector import BlankPageDetector
+            blank_detector = BlankPageDetector(
+                ink_threshold=blank_config.get('ink_threshold', 128),
+                max_ink_ratio=blank_config.get('max_ink_ratio', 0.005),
+                min_components=blank_config.get('min_components', 3),
+                min_component_pixels=blank_config.get('min_component_pixels', 6),
+                border=blank_config.get('border', 0.03),
+                illustration_ratio=blank_config.get('illustration_ratio', 0.3),
+                source_dpi=ocr_dpi
+            )
+        
+        journal = None
+        checkpoint_config = config.get('ocr_checkpoint', {})
+        if checkpoint_config.get('enabled', False):
+            ocr_inputs = ([config['paths']['input_pdf'], ocr_dpi]
+                          if fused else image_paths)
+            journal = OCRJournal(
+                checkpoint_config.get('journal', 'output/ocr_journal.jsonl'),
+                make_fingerprint(ocr_inputs, config['ocr']['language'],
+                                 config['ocr']['tesseract_config'],
+                                 preprocessor.signature() if preprocessor else '',
+                                 blank_detector.signature() if blank_detector else '')
+            )
+        
+        ocr = OCRExtractor(
+            language=config['ocr']['language'],
+            config=config['ocr']['tesseract_config'],
+            workers=config['ocr'].get('workers'),
+            cache=ocr_cache,
+            journal=journal,
+            profiler=profiler,
+            backend=config['ocr'].get('backend', 'pytesseract'),
+            preprocessor=preprocessor,
+            with_confidence=config['ocr'].get('confidence', False) or adaptive_enabled,
+            blank_detector=blank_detector
+        )
+        
+        with profiler.stage('pdf_to_images+ocr' if fused else 'ocr') as record:
+            if fused:
+                from src.fused_pipeline import FusedPDFOCRPipeline
+                pipeline = FusedPDFOCRPipeline(
+                    converter,
+                    ocr,
+                    queue_size=fused_config.get('queue_size', 4),
+                    image_output_dir=(config['paths']['output_images']
+                                      if fused_config.get('save_images', False) else None)
+                )
+                pages = pipeline.run_pages(config['paths']['input_pdf'], image_pages)
+            else:
+                pages = ocr.extract_pages(image_paths, image_pages)
+            if adaptive_enabled:
+                adaptive = _build_adaptive_ocr(config, ocr, preprocessor)
+                with profiler.stage('ocr.adaptive') as adaptive_record:
+                    pages = adaptive.refine(config['paths']['input_pdf'], pages)
+                    adaptive_record['items'] = len(adaptive.escalated)
+            if text_pages:
+                # Ghép trang lấy từ lớp văn bản với trang OCR theo thứ tự trang
+                pages = sorted(pages + [make_page_record(n, text, source='text_layer')
+                                        for n, text in text_pages.items()],
+                               key=lambda page: page['page'])
+                logger.info(f"{len(text_pages)} trang dùng lớp văn bản, "
+                            f"{len(pages) - len(text_pages)} trang OCR")
+            context.set_text('raw_text', ocr.join_pages(pages))
+            record['items'] = len(pages)
+            record['chars'] = context.size('raw_text')
+        
+        if ocr_cache:
+            ocr_cache.log_stats()
+        if blank_detector:
+            blank_detector.log_stats(pages)
+        if adaptive_enabled:
+            adaptive.log_stats()
+        
+        # Đánh dấu trang trùng gần đúng (trường duplicate_of trong pages.jsonl)
+        if dedup_enabled and dedup_config.get('pages', False):
+            with profiler.stage('ocr.dedup') as record:
+                index, book = _open_dedup_index(config)
+                try:
+                    duplicates = index.update('page', book,
+                                              ((page['page'], page['text']) for page in pages))
+                finally:
+                    index.close()
+                for page, duplicate_of in zip(pages, duplicates):
+                    page['duplicate_of'] = duplicate_of
+                record['items'] = len(pages)
+        
+        # Lưu kết quả theo trang và văn bản gốc
+        pages_path = config['paths'].get('pages')
+        if pages_path:
+            save_pages(pages, pages_path)
+            logger.info(f"Đã lưu kết quả theo trang: {pages_path}")
+        save_text(context.text('raw_text'), config['paths']['raw_text'])
+        logger.info(f"Đã lưu văn bản gốc: {config['paths']['raw_text']}")
+        if journal:
+            journal.clear()
+        graph.mark_done('ocr')
+    
+    # Bước 4: Làm sạch và chuẩn hóa văn bản
+    if skip_cleaning:
+        logger.info("\n[BƯỚC 4] ⏭️  BỎ QUA - Làm sạch và chuẩn hóa văn bản (không thay đổi)")
+        logger.info(f"  Sử dụng văn bản sạch có sẵn: {config['paths']['clean_text']}")
+    else:
+        logger.info("\n[BƯỚC 4] 🔄 Làm sạch và chuẩn hóa văn bản...")
+        from src.text_cleaner import TextCleaner
+        cleaner = TextCleaner(config, profiler=profiler)
+        streaming = config['cleaning'].get('streaming', False)
+        pages_path = config['paths'].get('pages')
+        has_pages = bool(pages_path) and os.path.exists(pages_path)
+        
+        # Tự động phát hiện header/footer lặp lại, cần kết quả OCR theo trang
+        detector = None
+        repeated_config = config['cleaning'].get('repeated_lines', {})
+        if repeated_config.get('enabled', False):
+            if has_pages:
+                from src.header_footer_detector import RepeatedLineDetector
+                detector = RepeatedLineDetector(
+                    zone_lines=repeated_config.get('zone_lines', 2),
+                    min_pages=repeated_config.get('min_pages', 4),
+                    min_ratio=repeated_config.get('min_ratio', 0.3),
+                    window_pages=repeated_config.get('window_pages', 8)
+                )
+                with profiler.stage('cleaning.repeated_lines') as record:
+                    detector.fit(load_pages(pages_path))
+                    record['items'] = detector.num_pages
+            else:
+                logger.info("  Không có kết quả OCR theo trang, bỏ qua phát hiện header/footer lặp lại")
+        
+        def page_records():
+            records = load_pages(pages_path)
+            return detector.strip(records) if detector else records
+        
+        # Làm sạch theo trang khi cần loại header/footer lặp hoặc cần số trang
+        # nguồn cho từng đoạn (segments dạng JSONL)
+        by_pages = has_pages and (detector is not None or segment_format == 'jsonl')
+        
+        if parallel and streaming:
+            logger.warning("⚠️  parallel_text bị bỏ qua: cleaning.streaming đang bật "
+                           "(làm sạch theo luồng chạy tuần tự)")
+        
+        with profiler.stage('cleaning') as record:
+            if by_pages and streaming:
+                # Đọc từng trang từ pages.jsonl và ghi clean_text theo luồng
+                context.set_size('clean_text', cleaner.clean_pages_file(
+                    page_records(), config['paths']['clean_text']))
+            elif by_pages and parallel:
+                # Đầu trang là ranh giới cắt khối an toàn
+                clean_text = parallel.clean_pages(page_records(), cleaner)
+                save_text(clean_text, config['paths']['clean_text'])
+                context.set_text('clean_text', clean_text)
+            elif by_pages:
+                clean_text = ''.join(cleaner.clean_pages(page_records()))
+                save_text(clean_text, config['paths']['clean_text'])
+                context.set_text('clean_text', clean_text)
+            elif streaming:
+                # Đọc raw_text và ghi clean_text theo luồng, bộ nhớ không đổi
+                context.set_size('clean_text', cleaner.clean_file(
+                    config['paths']['raw_text'], config['paths']['clean_text']))
+            elif parallel:
+                clean_text = parallel.clean(context.text('raw_text'), cleaner)
+                record['chars'] = context.size('raw_text')
+                save_text(clean_text, config['paths']['clean_text'])
+                context.set_text('clean_text', clean_text)
+            else:
+                clean_text = cleaner.clean(context.text('raw_text'))
+                record['chars'] = context.size('raw_text')
+                
+                # Lưu văn bản đã chuẩn hóa
+                save_text(clean_text, config['paths']['clean_text'])
+                context.set_text('clean_text', clean_text)
+            # Văn bản gốc không còn cần cho các bước sau
+            context.release('raw_text')
+        if by_pages:
+            context.save_page_offsets(cleaner.page_offsets)
+        elif os.path.exists(context.page_offsets_path):
+            os.remove(context.page_offsets_path)
+        if detector:
+            detector.log_stats()
+        logger.info(f"Đã lưu văn bản chuẩn hóa: {config['paths']['clean_text']}")
+        graph.mark_done('cleaning')
+    
+    # Bước 5: Phân đoạn văn bản
+    if skip_segmentation:
+        logger.info("\n[BƯỚC 5] ⏭️  BỎ QUA - Phân đoạn văn bản (không thay đổi)")
+    else:
+        logger.info("\n[BƯỚC 5] 🔄 Phân đoạn văn bản...")
+        from src.text_segmenter import TextSegmenter
+        from src.segment_writer import SegmentWriter
+        segmenter = TextSegmenter(
+            method=config['segmentation']['method'],
+            min_length=config['segmentation']['min_sentence_length'],
+            abbreviations=config['segmentation'].get('abbreviations')
+        )
+        clean_text = context.text('clean_text')
+        with profiler.stage('segmentation') as record:
+            # Ghi thẳng từng đoạn ra đĩa, không giữ danh sách đoạn trong bộ nhớ
+            spans = (parallel.iter_spans(clean_text, segmenter) if parallel
+                     else segmenter.iter_spans(clean_text))
+            duplicates = None
+            if dedup_enabled:
+                # Cần đủ các đoạn để tra chỉ mục theo lô, vị trí là số thứ tự đoạn
+                # trước khi bỏ trùng
+                spans = list(spans)
+                with profiler.stage('segmentation.dedup') as dedup_record:
+                    index, book = _open_dedup_index(config)
+                    try:
+                        duplicates = index.update(
+                            'segment', book,
+                            ((n, clean_text[start:end]) for n, (start, end) in enumerate(spans)))
+                    finally:
+                        index.close()
+                    dedup_record['items'] = len(spans)
+                if dedup_mode == 'drop':
+                    spans = [span for span, duplicate_of in zip(spans, duplicates)
+                             if duplicate_of is None]
+                    logger.info(f"Bỏ {len(duplicates) - len(spans)} đoạn trùng gần đúng")
+                    duplicates = None
+            with SegmentWriter(config['paths']['segments'],
+                               output_format=segment_format,
+                               index_path=config['paths'].get('segments_index'),
+                               page_offsets=context.load_page_offsets(),
+                               tag_duplicates=duplicates is not None) as writer:
+                writer.write_spans(clean_text, spans, duplicates)
+            context.num_segments = writer.count
+            logger.info(f"Đã chia thành {writer.count} đoạn")
+            record['items'] = writer.count
+            record['chars'] = len(clean_text)
+        graph.mark_done('segmentation')
+    
+    # Tổng kết
+    logger.info("\n" + "="*60)
+    logger.info("✅ HOÀN THÀNH QUY TRÌNH!")
+    logger.info("="*60)
+    
+    # Hiển thị thống kê từ bộ đếm của các bước, không đọc lại file
+    context.log_summary()
+    
+    logger.info(f"\nFile đầu ra:")
+    logger.info(f"  - {config['paths']['raw_text']}")
+    logger.info(f"  - {config['paths']['clean_text']}")
+    logger.info(f"  - {config['paths']['segments']}")
+    
+    profiler.log_summary()
+    profiler.save(profiling_config.get('metrics_json'), profiling_config.get('metrics_csv'))
+    
+    return 0
@@ -0,0 +1,103 @@
+"""
+Module lưu kết quả trung gian giữa các bước của pipeline (văn bản trong bộ nhớ,
+kích thước, số đoạn) để không phải đọc lại file đầu ra
+"""
+import json
+import os
+from src.utils import setup_logging, load_text
+
+logger = setup_logging()
+
+class PipelineContext:
+    # Tên hiển thị của các văn bản trung gian (khóa trùng với config['paths'])
+    LABELS = {
+        'raw_text': 'Văn bản gốc',
+        'clean_text': 'Văn bản chuẩn hóa',
+    }
+
+    def __init__(self, config):
+        """
+        Khởi tạo context cho một lần chạy
+
+        Args:
+            config (dict): Cấu hình từ config.yaml
+        """
+        self.paths = config['paths']
+        self.page_offsets = None
+        self.num_segments = None
+        self._texts = {}
+        self._sizes = {}
+
+    @property
+    def page_offsets_path(self):
+        """File lưu vị trí đầu mỗi trang trong văn bản sạch (cạnh clean_text)"""
+        return os.path.splitext(self.paths['clean_text'])[0] + '.pages.json'
+
+    def save_page_offsets(self, page_offsets):
+        """Lưu vị trí đầu mỗi trang để lần sau chỉ chạy lại bước phân đoạn vẫn có số trang"""
+        self.page_offsets = page_offsets
+        with open(self.page_offsets_path, 'w', encoding='utf-8') as f:
+            json.dump(page_offsets, f)
+
+    def load_page_offsets(self):
+        """Vị trí đầu mỗi trang của văn bản sạch, đọc từ file nếu bước làm sạch không chạy"""
+        if self.page_offsets is None and os.path.exists(self.page_offsets_path):
+            with open(self.page_offsets_path, 'r', encoding='utf-8') as f:
+                self.page_offsets = [tuple(item) for item in json.load(f)]
+        return self.page_offsets
+
+    def exists(self, name):
+        """Văn bản đã có trong bộ nhớ hoặc trên đĩa"""
+        return name in self._texts or os.path.exists(self.paths[name])
+
+    def set_text(self, name, text):
+        """Lưu văn bản vừa tạo để bước sau dùng trực tiếp"""
+        self._texts[name] = text
+        self._sizes[name] = len(text)
+
+    def set_size(self, name, size):
+        """Ghi nhận văn bản đã được ghi thẳng ra đĩa (chế độ luồng), chỉ giữ kích thước"""
+        self._texts.pop(name, None)
+        self._sizes[name] = size
+
+    def text(self, name):
+        """
+        Lấy văn bản, chỉ đọc file khi chưa có trong bộ nhớ
+
+        Args:
+            name (str): 'raw_text' hoặc 'clean_text'
+
+        Returns:
+            str: Nội dung văn bản
+        """
+        if name not in self._texts:
+            text = load_text(self.paths[name])
+            logger.info(f"  Đã load {self.LABELS[name].lower()}: {len(text)} ký tự")
+            self.set_text(name, text)
+        return self._texts[name]
+
+    def release(self, name):
+        """Giải phóng văn bản không còn dùng đến, vẫn giữ kích thước cho phần tổng kết"""
+        self._texts.pop(name, None)
+
+    def size(self, name):
+        """Số ký tự nếu văn bản đã được tạo/đọc trong lần chạy này, ngược lại None"""
+        return self._sizes.get(name)
+
+    def log_summary(self):
+        """Hiển thị thống kê từ các bộ đếm, không đọc lại file đầu ra"""
+        for name, label in self.LABELS.items():
+            size = self.size(name)
+            if size is not None:
+                logger.info(f"✓ {label}: {size:,} ký tự")
+            elif os.path.exists(self.paths[name]):
+                logger.info(f"✓ {label}: {os.path.getsize(self.paths[name]):,} byte (không chạy lại)")
+
+        num_segments = self.num_segments
+        if num_segments is None:
+            from src.segment_writer import count_segments
+            num_segments = count_segments(self.paths['segments'], self.paths.get('segments_index'))
+        if num_segments is not None:
+            logger.info(f"✓ Số đoạn phân tách: {num_segments:,}")
+        elif os.path.exists(self.paths['segments']):
+            logger.info(f"✓ Đoạn phân tách: {os.path.getsize(self.paths['segments']):,} byte (không chạy lại)")
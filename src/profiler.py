@@ -0,0 +1,155 @@
+"""
+Module đo thời gian, CPU và bộ nhớ cho từng bước của pipeline
+"""
+import cProfile
+import csv
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from src.utils import setup_logging
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+logger = setup_logging()
+
+CSV_FIELDS = ['name', 'wall_seconds', 'cpu_seconds', 'peak_memory_mb', 'max_rss_mb',
+              'items', 'chars', 'chars_per_second']
+
+def _max_rss_mb():
+    """Bộ nhớ RSS lớn nhất của tiến trình từ lúc khởi động (MB)"""
+    if resource is None:
+        return None
+    # Linux trả về KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageProfiler:
+    def __init__(self, enabled=True, track_memory=False, cprofile_dir=None):
+        """
+        Khởi tạo profiler
+        
+        Args:
+            enabled (bool): Tắt thì mọi lệnh đo đều không làm gì
+            track_memory (bool): Đo bộ nhớ đỉnh từng bước bằng tracemalloc (chậm hơn)
+            cprofile_dir (str): Thư mục lưu file cProfile cho từng bước (None = không lưu)
+        """
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.cprofile_dir = cprofile_dir if enabled else None
+        self.stages = []
+        self.pages = []
+        self._stack = []
+        
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.cprofile_dir:
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+    
+    @contextmanager
+    def stage(self, name):
+        """
+        Đo một bước xử lý. Bên gọi có thể ghi thêm 'items' và 'chars'
+        vào dict nhận được.
+        
+        Args:
+            name (str): Tên bước (ví dụ 'ocr', 'cleaning.normalize_unicode')
+            
+        Yields:
+            dict: Bản ghi của bước
+        """
+        record = {'name': name, 'items': None, 'chars': None}
+        if not self.enabled:
+            yield record
+            return
+        
+        frame = {'peak': 0}
+        if self.track_memory:
+            # Giữ lại đỉnh bộ nhớ của bước cha trước khi reset cho bước con
+            if self._stack:
+                parent = self._stack[-1]
+                parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        
+        profile = None
+        if self.cprofile_dir and len(self._stack) == 1:
+            profile = cProfile.Profile()
+            profile.enable()
+        
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if profile:
+                profile.disable()
+                profile.dump_stats(os.path.join(self.cprofile_dir, f"{name}.prof"))
+            
+            self._stack.pop()
+            peak = None
+            if self.track_memory:
+                peak_bytes = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak_bytes)
+                peak = round(peak_bytes / 1024 / 1024, 1)
+            
+            record.update({
+                'wall_seconds': round(wall, 4),
+                'cpu_seconds': round(cpu, 4),
+                'peak_memory_mb': peak,
+                'max_rss_mb': _max_rss_mb(),
+                'chars_per_second': round(record['chars'] / wall) if record['chars'] and wall > 0 else None
+            })
+            self.stages.append(record)
+    
+    def record_page(self, page, seconds, chars=None):
+        """
+        Ghi thời gian xử lý một trang OCR
+        
+        Args:
+            page (int): Số trang (bắt đầu từ 1)
+            seconds (float): Thời gian OCR
+            chars (int): Số ký tự trích xuất được
+        """
+        if self.enabled:
+            self.pages.append({'page': page, 'seconds': round(seconds, 4), 'chars': chars})
+    
+    def log_summary(self):
+        """Ghi log bảng tổng hợp thời gian các bước"""
+        if not self.enabled:
+            return
+        logger.info("Thời gian các bước:")
+        for record in self.stages:
+            extra = f", {record['chars_per_second']:,} ký tự/giây" if record['chars_per_second'] else ""
+            logger.info(f"  {record['name']:<40} {record['wall_seconds']:>9.3f} giây "
+                        f"(CPU {record['cpu_seconds']:.3f}){extra}")
+    
+    def save(self, json_path=None, csv_path=None):
+        """
+        Lưu số liệu ra file JSON và/hoặc CSV
+        
+        Args:
+            json_path (str): File JSON (gồm cả thời gian từng trang)
+            csv_path (str): File CSV (một dòng mỗi bước)
+        """
+        if not self.enabled:
+            return
+        if json_path:
+            os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'stages': self.stages, 'pages': sorted(self.pages, key=lambda p: p['page'])},
+                          f, ensure_ascii=False, indent=2)
+        if csv_path:
+            os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(self.stages)
+        logger.info(f"Đã lưu số liệu đo: {json_path or ''} {csv_path or ''}".rstrip())
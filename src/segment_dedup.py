@@ -0,0 +1,240 @@
+"""
+Module phát hiện đoạn/trang trùng gần đúng giữa các sách bằng MinHash + LSH,
+chỉ mục lưu trong SQLite để cập nhật dần qua nhiều lần chạy (không so sánh từng cặp)
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import unicodedata
+import numpy as np
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# Tăng khi đổi cách tính chữ ký, chỉ mục cũ sẽ được tạo lại
+INDEX_VERSION = 1
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+_NON_WORD_REGEX = re.compile(r'[^\w\s]+')
+_SPACES_REGEX = re.compile(r'\s+')
+
+# Số ký tự tối đa tính chữ ký trong một lần (bộ nhớ ~ num_perm x số ký tự x 8 byte)
+_BATCH_SHINGLES = 100000
+
+class DuplicateIndex:
+    def __init__(self, path, num_perm=64, bands=8, threshold=0.8, shingle_size=5,
+                 min_chars=50, seed=1):
+        """
+        Mở (hoặc tạo) chỉ mục trùng lặp
+
+        Args:
+            path (str): File SQLite dùng chung cho cả kho sách
+            num_perm (int): Số hàm băm của chữ ký MinHash
+            bands (int): Số dải LSH (num_perm chia hết cho bands); nhiều dải hơn thì tìm
+                         được cả cặp ít giống hơn nhưng nhiều ứng viên hơn
+            threshold (float): Độ giống Jaccard ước tính tối thiểu để coi là trùng (0-1)
+            shingle_size (int): Độ dài chuỗi ký tự con (shingle)
+            min_chars (int): Đoạn ngắn hơn không được xét (câu ngắn lặp lại là bình thường)
+            seed (int): Seed sinh các hàm băm (phải giữ nguyên trong suốt đời chỉ mục)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) phải chia hết cho bands ({bands})")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_chars = min_chars
+
+        rng = np.random.RandomState(seed)
+        # Hệ số lẻ 64 bit cho các hàm băm multiply-shift
+        self._a = rng.randint(0, 1 << 64, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, 1 << 64, size=num_perm, dtype=np.uint64)
+        self._band_mult = rng.randint(0, 1 << 64, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Tự quản lý transaction để khóa ghi cả lượt cập nhật một cuốn sách
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._open(f"{INDEX_VERSION}:{num_perm}:{bands}:{shingle_size}:{seed}")
+
+    def _open(self, params):
+        """Tạo bảng nếu chưa có, tạo lại chỉ mục nếu tham số chữ ký đã thay đổi"""
+        conn = self.conn
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row is not None and row[0] != params:
+            logger.warning(f"⚠️  Tham số chỉ mục trùng lặp đã thay đổi, tạo lại: {self.path}")
+            conn.execute("DROP TABLE IF EXISTS items")
+            conn.execute("DROP TABLE IF EXISTS bands")
+        conn.execute("""CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY, kind TEXT, book TEXT, position INTEGER, signature BLOB)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS items_book ON items (kind, book)")
+        conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, key INTEGER, item INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (band, key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_item ON bands (item)")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('params', ?)", (params,))
+
+    def close(self):
+        self.conn.close()
+
+    def _normalize(self, text):
+        """Chữ thường, bỏ dấu câu, gộp khoảng trắng; văn bản ngắn được đệm đủ một shingle"""
+        text = unicodedata.normalize('NFC', text).lower()
+        text = _SPACES_REGEX.sub(' ', _NON_WORD_REGEX.sub('', text)).strip()
+        return text.ljust(self.shingle_size)
+
+    def signatures(self, texts):
+        """
+        Tính chữ ký MinHash, vector hóa theo lô nhiều đoạn: băm mọi chuỗi ký tự con
+        (shingle) bằng rolling hash trên mảng mã ký tự rồi lấy min theo từng đoạn
+
+        Args:
+            texts (list): Các văn bản
+
+        Returns:
+            np.ndarray: Mảng uint32 (số văn bản, num_perm)
+        """
+        k = self.shingle_size
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(texts):
+            batch = []
+            size = 0
+            while start + len(batch) < len(texts) and (not batch or size < _BATCH_SHINGLES):
+                batch.append(self._normalize(texts[start + len(batch)]))
+                size += len(batch[-1])
+            codes = np.frombuffer(''.join(batch).encode('utf-32-le'), dtype=np.uint32)
+            codes = codes.astype(np.uint64)
+            lengths = np.array([len(text) for text in batch])
+
+            # Băm mọi cửa sổ k ký tự (tràn số uint64 là phép mod 2^64)
+            windows = len(codes) - k + 1
+            hashes = np.zeros(windows, dtype=np.uint64)
+            for j in range(k):
+                hashes = hashes * np.uint64(1000003) + codes[j:j + windows]
+            # Bỏ các cửa sổ vắt qua hai văn bản liền nhau
+            owner = np.repeat(np.arange(len(batch)), lengths)
+            hashes = hashes[owner[:windows] == owner[k - 1:]] & _MAX_HASH
+            counts = lengths - k + 1
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+            # Hàm băm (a * x + b) >> 32 (mod 2^64) trên mọi shingle, lấy min theo từng văn bản
+            permuted = (np.outer(self._a, hashes) + self._b[:, None]) >> _SHIFT
+            result[start:start + len(batch)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start += len(batch)
+        return result
+
+    def band_keys(self, kind, signatures):
+        """
+        Khóa 64 bit của từng dải LSH, tách riêng theo loại (đoạn/trang)
+
+        Args:
+            kind (str): 'segment' hoặc 'page'
+            signatures (np.ndarray): Chữ ký (số văn bản, num_perm)
+
+        Returns:
+            np.ndarray: Mảng int64 (số văn bản, bands)
+        """
+        salt = int.from_bytes(hashlib.blake2b(kind.encode('utf-8'), digest_size=8).digest(), 'little')
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = (bands * self._band_mult).sum(axis=2, dtype=np.uint64) ^ np.uint64(salt)
+        return keys.view(np.int64)
+
+    def _similarity(self, signature, other):
+        """Độ giống Jaccard ước tính: tỷ lệ hàm băm có giá trị min trùng nhau"""
+        return float(np.count_nonzero(signature == other)) / self.num_perm
+
+    def update(self, kind, book, items):
+        """
+        Tìm các mục trùng gần đúng với chỉ mục (kể cả trong cùng sách) và cập nhật chỉ mục.
+        Kết quả cũ của chính cuốn sách được thay thế nên chạy lại không tự trùng với mình
+
+        Args:
+            kind (str): 'segment' hoặc 'page'
+            book (str): Tên sách
+            items (iterable): (vị trí, văn bản) theo thứ tự, vị trí là số thứ tự đoạn/số trang
+
+        Returns:
+            list: Với mỗi mục, "sách:vị trí" của mục đã có mà nó trùng, hoặc None
+        """
+        items = list(items)
+        duplicates = [None] * len(items)
+        indexed = [i for i, (_, text) in enumerate(items) if len(text.strip()) >= self.min_chars]
+        signatures = self.signatures([items[i][1] for i in indexed])
+        keys = self.band_keys(kind, signatures).tolist()
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM bands WHERE item IN "
+                         "(SELECT id FROM items WHERE kind = ? AND book = ?)", (kind, book))
+            conn.execute("DELETE FROM items WHERE kind = ? AND book = ?", (kind, book))
+
+            # Ứng viên từ các sách khác: một phép join trên khóa dải thay vì truy vấn từng mục
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_bands (band INTEGER, key INTEGER, idx INTEGER)")
+            conn.execute("DELETE FROM new_bands")
+            conn.executemany("INSERT INTO new_bands VALUES (?, ?, ?)",
+                             ((band, key, n) for n, row in enumerate(keys)
+                              for band, key in enumerate(row)))
+            candidates = {}
+            for n, item in conn.execute("SELECT DISTINCT n.idx, b.item FROM new_bands n "
+                                        "JOIN bands b ON b.band = n.band AND b.key = n.key"):
+                candidates.setdefault(n, []).append(item)
+            stored = self._load_items({item for ids in candidates.values() for item in ids})
+
+            buckets = {}  # (dải, khóa) -> các mục đã giữ lại của sách này
+            new_rows = []
+            for n, i in enumerate(indexed):
+                signature = signatures[n]
+                best, best_score = None, self.threshold
+                for item in candidates.get(n, ()):
+                    other_book, position, other = stored[item]
+                    score = self._similarity(signature, other)
+                    if score >= best_score:
+                        best, best_score = f"{other_book}:{position}", score
+                for band, key in enumerate(keys[n]):
+                    for m in buckets.get((band, key), ()):
+                        score = self._similarity(signature, signatures[m])
+                        if score >= best_score:
+                            best, best_score = f"{book}:{items[indexed[m]][0]}", score
+                if best is not None:
+                    duplicates[i] = best
+                    continue
+                for band, key in enumerate(keys[n]):
+                    buckets.setdefault((band, key), []).append(n)
+                new_rows.append(n)
+
+            # Đang giữ khóa ghi nên có thể tự cấp id liên tiếp và ghi theo lô
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM items").fetchone()[0]
+            conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)",
+                             ((first_id + j, kind, book, items[indexed[n]][0],
+                               signatures[n].tobytes()) for j, n in enumerate(new_rows)))
+            conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                             ((band, key, first_id + j) for j, n in enumerate(new_rows)
+                              for band, key in enumerate(keys[n])))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        found = sum(1 for d in duplicates if d is not None)
+        same_book = sum(1 for d in duplicates if d is not None and d.startswith(f"{book}:"))
+        logger.info(f"Trùng lặp ({kind}): {found}/{len(items)} mục trùng gần đúng "
+                    f"({same_book} trong cùng sách, {found - same_book} với sách khác), "
+                    f"xét {len(indexed)} mục từ {self.min_chars} ký tự")
+        return duplicates
+
+    def _load_items(self, ids):
+        """Đọc (sách, vị trí, chữ ký) của các mục ứng viên theo lô"""
+        stored = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            query = (f"SELECT id, book, position, signature FROM items "
+                     f"WHERE id IN ({','.join('?' * len(batch))})")
+            for item, book, position, blob in self.conn.execute(query, batch):
+                stored[item] = (book, position, np.frombuffer(blob, dtype=np.uint32))
+        return stored
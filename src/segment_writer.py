@@ -0,0 +1,213 @@
+"""
+Module ghi các đoạn văn bản ra file theo luồng (TXT hoặc JSONL)
+kèm file chỉ mục vị trí để đọc trực tiếp đoạn thứ N
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# File chỉ mục: header (magic, số đoạn, định dạng 0 = text / 1 = jsonl) rồi count + 1
+# vị trí byte uint64 little-endian, đoạn N nằm trong [offsets[N], offsets[N + 1])
+INDEX_MAGIC = b'SEGIDX1\0'
+_HEADER = struct.Struct('<8sQQ')
+_OFFSET = struct.Struct('<Q')
+
+class SegmentWriter:
+    def __init__(self, filepath, output_format='text', index_path=None,
+                 page_offsets=None, buffer_size=1024 * 1024, tag_duplicates=False):
+        """
+        Khởi tạo bộ ghi đoạn văn bản
+
+        Args:
+            filepath (str): File đích
+            output_format (str): 'text' (mỗi dòng một đoạn) hoặc 'jsonl'
+                                 (id, text, start, end, page)
+            index_path (str): File chỉ mục vị trí byte (None = không ghi)
+            page_offsets (list): (vị trí ký tự, số trang) trong văn bản sạch, tăng dần
+            buffer_size (int): Số byte gom lại trước mỗi lần ghi
+            tag_duplicates (bool): Thêm trường duplicate_of ("sách:vị trí" của đoạn
+                                   trùng gần đúng đã có, hoặc null) vào JSONL
+        """
+        if output_format not in ('text', 'jsonl'):
+            logger.warning(f"Định dạng không hợp lệ: {output_format}. Sử dụng mặc định 'text'")
+            output_format = 'text'
+        self.filepath = filepath
+        self.output_format = output_format
+        self.index_path = index_path
+        self.page_offsets = page_offsets or []
+        self.buffer_size = buffer_size
+        self.tag_duplicates = tag_duplicates
+        self.count = 0
+        self.chars = 0
+        self.bytes = 0
+        self._offsets = array('Q', [0]) if index_path else None
+        self._buffer = []
+        self._buffered = 0
+        self._page_pos = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.filepath, 'wb')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _page_of(self, start):
+        """Số trang chứa vị trí start (các đoạn được ghi theo thứ tự tăng dần)"""
+        offsets = self.page_offsets
+        pos = self._page_pos
+        while pos + 1 < len(offsets) and offsets[pos + 1][0] <= start:
+            pos += 1
+        self._page_pos = pos
+        return offsets[pos][1] if offsets and offsets[pos][0] <= start else None
+
+    def write(self, segment, start=None, end=None, duplicate_of=None):
+        """
+        Thêm một đoạn vào bộ đệm, ghi ra đĩa khi bộ đệm đầy
+
+        Args:
+            segment (str): Nội dung đoạn
+            start (int): Vị trí bắt đầu trong văn bản sạch (dùng cho JSONL)
+            end (int): Vị trí kết thúc trong văn bản sạch
+            duplicate_of (str): Đoạn trùng gần đúng đã có (khi tag_duplicates)
+        """
+        if self.output_format == 'jsonl':
+            item = {
+                'id': self.count,
+                'text': segment,
+                'start': start,
+                'end': end,
+                'page': self._page_of(start) if start is not None else None
+            }
+            if self.tag_duplicates:
+                item['duplicate_of'] = duplicate_of
+            line = json.dumps(item, ensure_ascii=False) + '\n'
+        else:
+            line = segment + '\n'
+        data = line.encode('utf-8')
+
+        self.count += 1
+        self.chars += len(segment)
+        self.bytes += len(data)
+        if self._offsets is not None:
+            self._offsets.append(self.bytes)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_spans(self, text, spans, duplicates=None):
+        """
+        Ghi các đoạn theo vị trí (start, end) trong text mà không giữ danh sách đoạn
+
+        Args:
+            text (str): Văn bản sạch
+            spans (iterable): (start, end) từ TextSegmenter.iter_spans
+            duplicates (list): duplicate_of của từng đoạn, cùng thứ tự với spans
+
+        Returns:
+            int: Tổng số đoạn đã ghi
+        """
+        if duplicates is None:
+            for start, end in spans:
+                self.write(text[start:end], start, end)
+        else:
+            for (start, end), duplicate_of in zip(spans, duplicates):
+                self.write(text[start:end], start, end, duplicate_of)
+        return self.count
+
+    def flush(self):
+        """Ghi toàn bộ bộ đệm ra đĩa bằng một lần write"""
+        if self._buffer:
+            self._file.write(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def close(self):
+        """Ghi phần còn lại và file chỉ mục"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+        if self._offsets is not None:
+            offsets = self._offsets
+            if sys.byteorder != 'little':
+                offsets = array('Q', offsets)
+                offsets.byteswap()
+            with open(self.index_path, 'wb') as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, self.count,
+                                     int(self.output_format == 'jsonl')))
+                offsets.tofile(f)
+
+        logger.info(f"Lưu {self.count} đoạn vào file: {self.filepath}")
+
+class SegmentIndex:
+    def __init__(self, filepath, index_path):
+        """
+        Đọc trực tiếp đoạn thứ N qua file chỉ mục, không quét file đoạn
+
+        Args:
+            filepath (str): File đoạn (TXT hoặc JSONL)
+            index_path (str): File chỉ mục do SegmentWriter ghi
+        """
+        self.filepath = filepath
+        self.index_path = index_path
+        with open(index_path, 'rb') as f:
+            magic, self.count, jsonl = _HEADER.unpack(f.read(_HEADER.size))
+        self.jsonl = bool(jsonl)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"File chỉ mục không hợp lệ: {index_path}")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        """
+        Đọc dòng thứ n của file đoạn (chuỗi TXT hoặc dict JSONL)
+
+        Args:
+            n (int): Số thứ tự đoạn (từ 0)
+
+        Returns:
+            str | dict: Nội dung đoạn
+        """
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        with open(self.index_path, 'rb') as f:
+            f.seek(_HEADER.size + n * _OFFSET.size)
+            start, end = struct.unpack('<2Q', f.read(2 * _OFFSET.size))
+        with open(self.filepath, 'rb') as f:
+            f.seek(start)
+            line = f.read(end - start).decode('utf-8')[:-1]
+        return json.loads(line) if self.jsonl else line
+
+def count_segments(filepath, index_path=None):
+    """
+    Đọc số đoạn từ header file chỉ mục (không quét file đoạn)
+
+    Args:
+        filepath (str): File đoạn
+        index_path (str): File chỉ mục (có thể None)
+
+    Returns:
+        int: Số đoạn, hoặc None nếu không có chỉ mục còn khớp với file đoạn
+    """
+    if not (index_path and os.path.exists(filepath) and os.path.exists(index_path)):
+        return None
+    if os.path.getmtime(index_path) < os.path.getmtime(filepath):
+        return None
+    try:
+        return len(SegmentIndex(filepath, index_path))
+    except (ValueError, struct.error):
+        return None
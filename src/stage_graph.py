@@ -0,0 +1,194 @@
+"""
+Module đồ thị các bước xử lý: mỗi bước ghi lại dấu vân tay của đầu vào và cấu hình,
+chỉ chạy lại khi có thay đổi phía trước (tương tự make/ninja)
+"""
+import hashlib
+import json
+import os
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+def _file_stats(path):
+    """
+    Liệt kê (tên, kích thước, thời gian sửa) của file hoặc các file trong thư mục
+
+    Args:
+        path (str): Đường dẫn file/thư mục
+
+    Returns:
+        list: Thông tin từng file, rỗng nếu không tồn tại
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [(os.path.basename(path), stat.st_size, stat.st_mtime_ns)]
+    if os.path.isdir(path):
+        stats = []
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            if entry.is_file():
+                stat = entry.stat()
+                stats.append((entry.name, stat.st_size, stat.st_mtime_ns))
+        return stats
+    return []
+
+def fingerprint_paths(paths):
+    """
+    Dấu vân tay của danh sách file/thư mục theo kích thước và thời gian sửa
+
+    Args:
+        paths (list): Các đường dẫn
+
+    Returns:
+        str: Dấu vân tay dạng hex
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(path.encode('utf-8') + b'\0')
+        stats = _file_stats(path)
+        if not stats:
+            digest.update(b'missing\0')
+        for name, size, mtime in stats:
+            digest.update(f"{name}:{size}:{mtime}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+def fingerprint_config(value):
+    """Dấu vân tay của phần cấu hình liên quan đến một bước"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+class Stage:
+    def __init__(self, name, inputs=(), outputs=(), optional_outputs=(), config=None, depends=()):
+        """
+        Khai báo một bước xử lý
+
+        Args:
+            name (str): Tên bước
+            inputs (list): File/thư mục đầu vào
+            outputs (list): File/thư mục kết quả bắt buộc
+            optional_outputs (list): Kết quả phụ (thiếu cũng không phải chạy lại)
+            config (dict): Phần cấu hình ảnh hưởng đến kết quả
+            depends (list): Các bước phía trước
+        """
+        self.name = name
+        self.inputs = [p for p in inputs if p]
+        self.outputs = [p for p in outputs if p]
+        self.optional_outputs = [p for p in optional_outputs if p]
+        self.config = config or {}
+        self.depends = list(depends)
+
+    def stamp(self):
+        """Trạng thái hiện tại: dấu vân tay của đầu vào, cấu hình và kết quả"""
+        return {
+            'inputs': fingerprint_paths(self.inputs),
+            'config': fingerprint_config(self.config),
+            'outputs': fingerprint_paths(self.outputs + [p for p in self.optional_outputs
+                                                         if os.path.exists(p)]),
+        }
+
+    def outputs_exist(self):
+        """Toàn bộ kết quả bắt buộc đã tồn tại"""
+        return all(_file_stats(p) for p in self.outputs)
+
+    def outputs_newer_than_inputs(self):
+        """Kết quả không cũ hơn đầu vào (quy tắc của make, bỏ qua đầu vào không tồn tại)"""
+        input_times = [s[2] for p in self.inputs for s in _file_stats(p)]
+        output_times = [s[2] for p in self.outputs for s in _file_stats(p)]
+        return not input_times or min(output_times) >= max(input_times)
+
+class StageGraph:
+    def __init__(self, state_path, adopt_existing=False):
+        """
+        Khởi tạo đồ thị các bước
+
+        Args:
+            state_path (str): File JSON lưu trạng thái lần chạy trước của từng bước
+            adopt_existing (bool): Bước chưa có trạng thái nhận kết quả có sẵn nếu mới hơn
+                                   đầu vào (False = chạy lại, vì không biết kết quả được
+                                   tạo với cấu hình nào)
+        """
+        self.state_path = state_path
+        self.adopt_existing = adopt_existing
+        self.stages = {}
+        self.state = {}
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"⚠️  File trạng thái hỏng, chạy lại toàn bộ: {state_path}")
+
+    def add(self, stage):
+        """Thêm bước (theo thứ tự topo: các bước phía trước phải được thêm trước)"""
+        self.stages[stage.name] = stage
+
+    def _check(self, stage, to_run, force):
+        """
+        Xét một bước có phải chạy lại hay không
+
+        Args:
+            stage (Stage): Bước cần xét
+            to_run (list): Các bước phía trước đã được lên lịch chạy
+            force (list): Các bước bị buộc chạy lại
+
+        Returns:
+            tuple: (True nếu phải chạy, lý do)
+        """
+        if 'all' in force or stage.name in force:
+            return True, "buộc chạy lại"
+        if any(name in to_run for name in stage.depends):
+            return True, "bước phía trước chạy lại"
+        if not stage.outputs_exist():
+            return True, "chưa có kết quả"
+
+        current = stage.stamp()
+        previous = self.state.get(stage.name)
+        if previous is None:
+            if not self.adopt_existing:
+                return True, "chưa có trạng thái lần chạy trước"
+            # Kết quả có từ trước khi dùng đồ thị: nhận nếu mới hơn đầu vào
+            if stage.outputs_newer_than_inputs():
+                self.state[stage.name] = current
+                self._save()
+                return False, "dùng kết quả có sẵn, mới hơn đầu vào"
+            return True, "đầu vào mới hơn kết quả"
+        if previous.get('outputs') != current['outputs']:
+            return True, "kết quả đã bị sửa"
+        if previous.get('inputs') != current['inputs']:
+            return True, "đầu vào thay đổi"
+        if previous.get('config') != current['config']:
+            return True, "cấu hình thay đổi"
+        return False, "không thay đổi"
+
+    def plan(self, force=()):
+        """
+        Xác định các bước cần chạy
+
+        Args:
+            force (list): Tên các bước buộc chạy lại ('all' = tất cả)
+
+        Returns:
+            list: Tên các bước cần chạy theo thứ tự
+        """
+        logger.info("Kiểm tra các bước cần chạy lại...")
+        to_run = []
+        for stage in self.stages.values():
+            run, reason = self._check(stage, to_run, force)
+            if run:
+                to_run.append(stage.name)
+            logger.info(f"  {stage.name}: {'chạy' if run else 'bỏ qua'} ({reason})")
+        return to_run
+
+    def mark_done(self, name):
+        """Ghi lại trạng thái sau khi bước chạy xong"""
+        self.state[name] = self.stages[name].stamp()
+        self._save()
+
+    def _save(self):
+        """Lưu file trạng thái (ghi file tạm rồi đổi tên)"""
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
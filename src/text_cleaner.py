@@ -1,24 +1,137 @@
 """
 Module chuẩn hóa và làm sạch văn bản
 """
+import os
 import re
 import unicodedata
+from collections import deque
 from src.utils import setup_logging
+from src.profiler import StageProfiler
 
 logger = setup_logging()
 
+_URL_REGEX = re.compile(r'http\S+|www\.\S+')
+_SPACES_REGEX = re.compile(r'[ \t]+')
+# Pattern không gộp được vào regex chung: backreference theo số (số group bị lệch khi gộp),
+# group có tên (trùng tên giữa các pattern) và cờ toàn cục đầu pattern như (?i)
+_STANDALONE_PATTERN_REGEX = re.compile(r'\\[1-9]|\(\?P[<=]|^\(\?[aiLmsux]+\)')
+
 class TextCleaner:
-    def __init__(self, config):
+    def __init__(self, config, profiler=None):
         """
         Khởi tạo text cleaner
         
         Args:
             config (dict): Cấu hình từ config.yaml
+            profiler (StageProfiler): Đo thời gian từng bước con (None = không đo)
         """
         self.config = config
-        self.remove_patterns = config['cleaning']['remove_patterns']
+        self.profiler = profiler or StageProfiler(enabled=False)
+        self.remove_patterns = config['cleaning']['remove_patterns'] or []
         self.unicode_form = config['cleaning']['unicode_form']
+        self.remove_regex, self.standalone_patterns = self._compile_remove_patterns(
+            self.remove_patterns)
+        self.pattern_counts = [0] * len(self.remove_patterns)
+        self.corrector = self._load_corrector(config['cleaning'].get('corrections', {}))
+        self.page_offsets = []
+        
+    @staticmethod
+    def _load_corrector(corrections_config):
+        """
+        Nạp từ điển sửa lỗi OCR nếu được bật trong cấu hình
+        
+        Args:
+            corrections_config (dict): Mục cleaning.corrections
+            
+        Returns:
+            OCRCorrector: Bộ sửa lỗi, hoặc None nếu tắt/không có từ điển
+        """
+        if not corrections_config.get('enabled', False):
+            return None
+        dictionary = corrections_config.get('dictionary')
+        if not dictionary or not os.path.exists(dictionary):
+            logger.warning(f"⚠️  Không tìm thấy từ điển sửa lỗi OCR: {dictionary}")
+            return None
+        from src.ocr_corrector import OCRCorrector
+        return OCRCorrector.load(dictionary, corrections_config.get('compiled'))
+    
+    @staticmethod
+    def _compile_remove_patterns(patterns):
+        """
+        Biên dịch một lần các pattern thành một regex dạng (?P<p0>...)|(?P<p1>...).
+        Pattern có backreference theo số, group có tên hoặc cờ toàn cục (?i) được
+        biên dịch riêng, khớp như re.search từng pattern trước đây
+        
+        Args:
+            patterns (list): Danh sách pattern header/footer
+            
+        Returns:
+            tuple: (regex gộp hoặc None, danh sách (vị trí, regex riêng))
+        """
+        combined = []
+        standalone = []
+        for i, pattern in enumerate(patterns or []):
+            if _STANDALONE_PATTERN_REGEX.search(pattern):
+                standalone.append((i, re.compile(pattern, re.IGNORECASE)))
+            else:
+                combined.append((i, pattern))
+        if not combined:
+            return None, standalone
+        try:
+            regex = re.compile('|'.join(f'(?P<p{i}>{pattern})' for i, pattern in combined),
+                               re.IGNORECASE)
+        except re.error:
+            # Pattern có cú pháp không gộp được khác: biên dịch riêng toàn bộ
+            standalone = sorted(standalone + [(i, re.compile(pattern, re.IGNORECASE))
+                                              for i, pattern in combined])
+            return None, standalone
+        return regex, standalone
+    
+    def _matched_pattern(self, match):
+        """Xác định vị trí pattern đã khớp trong remove_patterns"""
+        name = match.lastgroup
+        if name is None or not name.startswith('p'):
+            # Pattern người dùng có group con, tìm group ngoài cùng đã khớp
+            name = next(name for name, value in match.groupdict().items() if value is not None)
+        return int(name[1:])
+    
+    def _match_line(self, line):
+        """
+        Vị trí pattern đầu tiên (theo thứ tự cấu hình) khớp với dòng
+        
+        Args:
+            line (str): Một dòng văn bản gốc
+            
+        Returns:
+            int: Vị trí trong remove_patterns, None nếu không pattern nào khớp
+        """
+        index = None
+        if self.remove_regex is not None:
+            match = self.remove_regex.search(line)
+            if match is not None:
+                index = self._matched_pattern(match)
+        for i, regex in self.standalone_patterns:
+            if index is not None and i > index:
+                break
+            if regex.search(line):
+                return i
+        return index
+    
+    @property
+    def _line_filter(self):
+        """Hàm lọc dòng: regex gộp khi mọi pattern đều gộp được, None nếu không có pattern"""
+        if self.standalone_patterns:
+            return self._match_line
+        if self.remove_regex is None:
+            return None
+        search = self.remove_regex.search
+        matched_pattern = self._matched_pattern
         
+        def match_line(line):
+            match = search(line)
+            return None if match is None else matched_pattern(match)
+        return match_line
+    
     def remove_headers_footers(self, text):
         """
         Loại bỏ header, footer, số trang
@@ -31,19 +144,24 @@ class TextCleaner:
         """
         logger.info("Loại bỏ header, footer, số trang...")
         
-        lines = text.split('\n')
+        match_line = self._line_filter
+        if match_line is None:
+            return text
+        
+        counts = [0] * len(self.remove_patterns)
         cleaned_lines = []
         
-        for line in lines:
-            # Kiểm tra từng pattern
-            should_remove = False
-            for pattern in self.remove_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    should_remove = True
-                    break
-            
-            if not should_remove:
+        for line in text.split('\n'):
+            index = match_line(line)
+            if index is None:
                 cleaned_lines.append(line)
+            else:
+                counts[index] += 1
+        
+        for pattern, count in zip(self.remove_patterns, counts):
+            if count:
+                logger.info(f"  Pattern {pattern!r}: loại bỏ {count} dòng")
+        self.pattern_counts = [a + b for a, b in zip(self.pattern_counts, counts)]
         
         return '\n'.join(cleaned_lines)
     
@@ -64,7 +182,7 @@ class TextCleaner:
         text = text.replace('\x0c', '')
         
         # Loại bỏ URL
-        text = re.sub(r'http\S+|www\.\S+', '', text)
+        text = _URL_REGEX.sub('', text)
         
         return text
     
@@ -94,7 +212,7 @@ class TextCleaner:
         logger.info("Chuẩn hóa khoảng trắng...")
         
         # Chuyển nhiều space thành 1 space
-        text = re.sub(r'[ \t]+', ' ', text)
+        text = _SPACES_REGEX.sub(' ', text)
         
         # Xóa khoảng trắng đầu/cuối mỗi dòng
         lines = [line.strip() for line in text.split('\n')]
@@ -108,6 +226,24 @@ class TextCleaner:
         
         return text
     
+    def correct_ocr_errors(self, text):
+        """
+        Sửa lỗi OCR theo từ điển (một lượt quét Aho-Corasick)
+        
+        Args:
+            text (str): Văn bản đầu vào
+            
+        Returns:
+            str: Văn bản đã sửa lỗi
+        """
+        if self.corrector is None:
+            return text
+        logger.info("Sửa lỗi OCR theo từ điển...")
+        before = self.corrector.corrections
+        text = self.corrector.correct(text)
+        logger.info(f"  Đã sửa {self.corrector.corrections - before} lỗi")
+        return text
+    
     def clean(self, text):
         """
         Thực hiện toàn bộ quy trình làm sạch văn bản
@@ -120,19 +256,318 @@ class TextCleaner:
         """
         logger.info("=== BẮT ĐẦU QUY TRÌNH LÀM SẠCH VĂN BẢN ===")
         
-        # Bước 1: Loại bỏ header/footer
-        text = self.remove_headers_footers(text)
+        steps = [
+            self.remove_headers_footers,     # Bước 1: Loại bỏ header/footer
+            self.remove_special_characters,  # Bước 2: Loại bỏ ký tự đặc biệt
+            self.normalize_unicode,          # Bước 3: Chuẩn hóa Unicode
+            self.normalize_whitespace,       # Bước 4: Chuẩn hóa khoảng trắng
+            self.correct_ocr_errors,         # Bước 5: Sửa lỗi OCR theo từ điển
+        ]
+        for step in steps:
+            with self.profiler.stage(f"cleaning.{step.__name__}") as record:
+                record['chars'] = len(text)
+                text = step(text)
         
-        # Bước 2: Loại bỏ ký tự đặc biệt
-        text = self.remove_special_characters(text)
+        logger.info("=== HOÀN THÀNH LÀM SẠCH VĂN BẢN ===")
+        logger.info(f"Độ dài văn bản sau khi làm sạch: {len(text)} ký tự")
         
-        # Bước 3: Chuẩn hóa Unicode
-        text = self.normalize_unicode(text)
+        return text
+    
+    @staticmethod
+    def _iter_lines(chunks):
+        """
+        Tách luồng chuỗi (dòng, trang hoặc khối bất kỳ) thành các dòng.
+        Các khối được nối nguyên trạng, kết quả giống text.split('\\n').
         
-        # Bước 4: Chuẩn hóa khoảng trắng
-        text = self.normalize_whitespace(text)
+        Args:
+            chunks (iterable): Các khối văn bản liên tiếp
+            
+        Yields:
+            str: Từng dòng (không kèm '\\n')
+        """
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            if '\n' not in chunk:
+                continue
+            lines = buffer.split('\n')
+            buffer = lines.pop()
+            yield from lines
+        yield buffer
+    
+    def _clean_line(self, line):
+        """
+        Áp dụng các bước làm sạch chỉ phụ thuộc vào một dòng
+        (ký tự đặc biệt, Unicode, khoảng trắng, sửa lỗi OCR)
+        
+        Args:
+            line (str): Một dòng đã qua bộ lọc header/footer
+            
+        Returns:
+            str: Dòng đã làm sạch
+        """
+        line = line.replace('\ufeff', '').replace('\x0c', '')
+        line = _URL_REGEX.sub('', line)
+        line = unicodedata.normalize(self.unicode_form, line)
+        line = _SPACES_REGEX.sub(' ', line).strip()
+        if self.corrector is not None and line:
+            line = self.corrector.correct(line)
+        return line
+    
+    def clean_block(self, text, page_marks=()):
+        """
+        Làm sạch độc lập một khối dòng liên tiếp của văn bản gốc (chạy trong tiến trình con
+        ở chế độ song song). Số dòng trống ở hai đầu khối được trả riêng để ghép lại
+        bằng join_blocks cho kết quả giống hệt clean()/clean_pages()
+        
+        Args:
+            text (str): Khối dòng (văn bản gốc cắt tại ký tự '\n', bỏ ký tự đó)
+            page_marks (list): (số thứ tự dòng trong khối, số trang) tại đầu mỗi trang
+            
+        Returns:
+            tuple: (số dòng giữ lại tính đến hết dòng có nội dung đầu tiên, phần văn bản
+                    từ dòng có nội dung đầu tiên đến cuối cùng, số dòng giữ lại sau dòng
+                    có nội dung cuối cùng, số dòng bị loại theo từng pattern, số lỗi OCR đã sửa,
+                    (vị trí trong phần văn bản, số trang) của đầu mỗi trang)
+                    Phần văn bản là None nếu khối không có dòng nào có nội dung; vị trí là
+                    None nếu sau đầu trang không còn dòng có nội dung nào trong khối
+        """
+        max_newlines = self.config['cleaning']['max_consecutive_newlines']
+        match_line = self._line_filter
+        counts = [0] * len(self.remove_patterns)
+        corrections = self.corrector.corrections if self.corrector is not None else 0
+        marks = deque(page_marks)
+        pages = []
+        waiting_pages = []
+        parts = []
+        size = 0
+        lead = None
+        kept = 0  # Số dòng giữ lại kể từ dòng có nội dung gần nhất
+        for line_no, line in enumerate(text.split('\n')):
+            while marks and marks[0][0] <= line_no:
+                waiting_pages.append(marks.popleft()[1])
+            if match_line:
+                index = match_line(line)
+                if index is not None:
+                    counts[index] += 1
+                    continue
+            kept += 1
+            line = self._clean_line(line)
+            if not line:
+                continue
+            prefix = ''
+            if lead is None:
+                lead = kept
+            else:
+                prefix = '\n' * (max_newlines if kept >= 2 else kept)
+            if waiting_pages:
+                pages.extend((size + len(prefix), page) for page in waiting_pages)
+                waiting_pages = []
+            parts.append(prefix + line)
+            size += len(prefix) + len(line)
+            kept = 0
+        
+        pages.extend((None, page) for page in waiting_pages)
+        if self.corrector is not None:
+            corrections = self.corrector.corrections - corrections
+        if lead is None:
+            return kept, None, 0, counts, corrections, pages
+        return lead, ''.join(parts), kept, counts, corrections, pages
+    
+    def join_blocks(self, blocks):
+        """
+        Ghép kết quả clean_block của các khối liên tiếp. Sau khi chạy xong,
+        self.page_offsets chứa vị trí đầu mỗi trang trong văn bản sạch như clean_pages()
+        
+        Args:
+            blocks (iterable): Kết quả clean_block theo thứ tự khối
+            
+        Yields:
+            str: Các phần văn bản đã làm sạch, nối lại giống hệt clean() của cả văn bản
+        """
+        max_newlines = self.config['cleaning']['max_consecutive_newlines']
+        self.page_offsets = []
+        waiting_pages = []
+        position = 0
+        # Số dòng giữ lại chưa ghép kể từ dòng có nội dung gần nhất; dòng giữ lại
+        # đầu tiên của cả văn bản không tạo ký tự '\n' nào nên bắt đầu từ -1
+        carry = -1
+        for lead, body, trail, counts, corrections, pages in blocks:
+            self.pattern_counts = [a + b for a, b in zip(self.pattern_counts, counts)]
+            if self.corrector is not None:
+                self.corrector.corrections += corrections
+            if body is None:
+                carry += lead
+                waiting_pages.extend(page for _, page in pages)
+                continue
+            pending = carry + lead
+            prefix = '\n' * (max_newlines if pending >= 2 else pending)
+            start = position + len(prefix)
+            # Trang chờ từ các khối trước bắt đầu ở dòng có nội dung đầu tiên của khối này
+            self.page_offsets.extend((start, page) for page in waiting_pages)
+            waiting_pages = []
+            for offset, page in pages:
+                if offset is None:
+                    waiting_pages.append(page)
+                else:
+                    self.page_offsets.append((start + offset, page))
+            position = start + len(body)
+            yield prefix + body
+            carry = trail
+        self.page_offsets.extend((position, page) for page in waiting_pages)
+        if carry > 0:
+            yield '\n' * (max_newlines if carry >= 2 else carry)
+    
+    def clean_stream(self, chunks, page_marks=None, stage='cleaning.stream'):
+        """
+        Làm sạch văn bản theo luồng với bộ nhớ không đổi.
+        ''.join(clean_stream([text])) cho kết quả giống hệt clean(text).
+        Các bước con chạy xen kẽ trên từng dòng nên profiler chỉ đo chung một bước
+        (gồm cả thời gian bên gọi xử lý từng phần, ví dụ ghi file)
+        
+        Args:
+            chunks (iterable): Các dòng/trang/khối văn bản gốc (ví dụ file object)
+            page_marks (deque): (số thứ tự dòng gốc, số trang) tại đầu mỗi trang; vị trí
+                                tương ứng trong văn bản sạch được lưu vào self.page_offsets
+            stage (str): Tên bước trong profiler (items = số dòng gốc, hoặc số trang nếu có
+                         page_marks; chars = số ký tự gốc)
+            
+        Yields:
+            str: Các phần văn bản đã làm sạch, nối lại thành văn bản hoàn chỉnh
+        """
+        max_newlines = self.config['cleaning']['max_consecutive_newlines']
+        match_line = self._line_filter
+        self.page_offsets = []
+        waiting_pages = []
+        position = 0
+        chars = -1  # Dòng đầu tiên không có ký tự '\n' đứng trước
+        
+        # Số '\n' đang chờ kể từ dòng có nội dung gần nhất; chuỗi >= 2 '\n'
+        # (tức có dòng trống) được thay bằng max_newlines như normalize_whitespace
+        pending = 0
+        first = True
+        pages = 0
+        with self.profiler.stage(stage) as record:
+            for line_no, line in enumerate(self._iter_lines(chunks)):
+                chars += len(line) + 1
+                while page_marks and page_marks[0][0] <= line_no:
+                    waiting_pages.append(page_marks.popleft()[1])
+                    pages += 1
+                if match_line:
+                    index = match_line(line)
+                    if index is not None:
+                        self.pattern_counts[index] += 1
+                        continue
+                
+                if not first:
+                    pending += 1
+                first = False
+                
+                line = self._clean_line(line)
+                if line:
+                    if pending >= 2:
+                        pending = max_newlines
+                    if waiting_pages:
+                        self.page_offsets.extend((position + pending, page)
+                                                 for page in waiting_pages)
+                        waiting_pages = []
+                    position += pending + len(line)
+                    yield '\n' * pending + line
+                    pending = 0
+            
+            if pending >= 2:
+                pending = max_newlines
+            self.page_offsets.extend((position, page) for page in waiting_pages)
+            if pending:
+                yield '\n' * pending
+            record['items'] = pages if page_marks is not None else line_no + 1
+            record['chars'] = chars
+    
+    @staticmethod
+    def _page_chunks(records, page_marks=None):
+        """
+        Nối văn bản các trang như raw_text.txt, bỏ qua trang trống.
+        Nếu có page_marks, thêm (số thứ tự dòng đầu trang, số trang) cho mỗi trang
+        """
+        line_no = 0
+        for record in records:
+            text = record['text']
+            if text.strip():
+                if page_marks is not None:
+                    page_marks.append((line_no, record['page']))
+                    line_no += text.count('\n') + 2
+                yield text
+                yield '\n\n'
+    
+    @classmethod
+    def join_pages(cls, records):
+        """
+        Ghép các trang thành văn bản gốc giống raw_text.txt
+        
+        Args:
+            records (iterable): Bản ghi trang có khóa 'text'
+            
+        Returns:
+            str: Văn bản gốc
+        """
+        return ''.join(cls._page_chunks(records))
+    
+    def clean_pages(self, records):
+        """
+        Làm sạch theo luồng từ kết quả OCR theo trang (ví dụ load_pages('pages.jsonl')).
+        Trang trống bị bỏ qua và các trang được nối như raw_text.txt. Sau khi chạy xong,
+        self.page_offsets chứa (vị trí ký tự, số trang) của đầu mỗi trang trong văn bản sạch.
+        
+        Args:
+            records (iterable): Bản ghi trang có khóa 'page' và 'text'
+            
+        Yields:
+            str: Các phần văn bản đã làm sạch
+        """
+        page_marks = deque()
+        return self.clean_stream(self._page_chunks(records, page_marks), page_marks,
+                                 stage='cleaning.by_pages')
+    
+    def _write_stream(self, parts, output_path):
+        """Ghi các phần văn bản đã làm sạch ra file, trả về tổng số ký tự"""
+        total = 0
+        with open(output_path, 'w', encoding='utf-8') as dst:
+            for part in parts:
+                dst.write(part)
+                total += len(part)
         
         logger.info("=== HOÀN THÀNH LÀM SẠCH VĂN BẢN ===")
-        logger.info(f"Độ dài văn bản sau khi làm sạch: {len(text)} ký tự")
+        logger.info(f"Độ dài văn bản sau khi làm sạch: {total} ký tự")
+        return total
+    
+    def clean_file(self, input_path, output_path, block_size=1024 * 1024):
+        """
+        Làm sạch file văn bản theo luồng, không đọc toàn bộ file vào bộ nhớ
         
-        return text
\ No newline at end of file
+        Args:
+            input_path (str): File văn bản gốc
+            output_path (str): File đích
+            block_size (int): Số ký tự đọc mỗi lần
+            
+        Returns:
+            int: Độ dài văn bản sau khi làm sạch (ký tự)
+        """
+        logger.info("=== BẮT ĐẦU LÀM SẠCH VĂN BẢN THEO LUỒNG ===")
+        
+        with open(input_path, 'r', encoding='utf-8') as src:
+            blocks = iter(lambda: src.read(block_size), '')
+            return self._write_stream(self.clean_stream(blocks), output_path)
+    
+    def clean_pages_file(self, records, output_path):
+        """
+        Làm sạch theo luồng từ bản ghi trang và ghi ra file
+        
+        Args:
+            records (iterable): Bản ghi trang (ví dụ load_pages('pages.jsonl'))
+            output_path (str): File đích
+            
+        Returns:
+            int: Độ dài văn bản sau khi làm sạch (ký tự)
+        """
+        logger.info("=== BẮT ĐẦU LÀM SẠCH VĂN BẢN THEO LUỒNG (THEO TRANG) ===")
+        return self._write_stream(self.clean_pages(records), output_path)
@@ -0,0 +1,118 @@
+"""
+Module đọc lớp văn bản có sẵn trong PDF (PDF gốc dạng số hoặc đã OCR) bằng
+pdftotext của Poppler, để chỉ OCR những trang chỉ có ảnh
+"""
+import subprocess
+import unicodedata
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+def _vietnamese_letters():
+    """Tập chữ cái tiếng Việt (kèm dấu thanh, dạng NFC, cả chữ hoa)"""
+    letters = set()
+    for base in 'aăâbcdđeêghiklmnoôơpqrstuưvxy':
+        letters.add(base)
+        if base in 'aăâeêioôơuưy':
+            for mark in '̣̀́̉̃':
+                letters.add(unicodedata.normalize('NFC', base + mark))
+    return frozenset(letters | {c.upper() for c in letters})
+
+VIETNAMESE_LETTERS = _vietnamese_letters()
+_EXTRA_CHARS = frozenset('–—…“”‘’•«»°§©')
+
+class TextLayerProbe:
+    def __init__(self, min_chars=50, min_quality=0.95, command='pdftotext'):
+        """
+        Khởi tạo bộ kiểm tra lớp văn bản
+
+        Args:
+            min_chars (int): Số ký tự (không tính khoảng trắng) tối thiểu để dùng lớp văn bản
+            min_quality (float): Tỷ lệ ký tự hợp lệ tối thiểu (loại font mã hóa cũ TCVN3/VNI,
+                                 ký tự lỗi '�'...)
+            command (str): Lệnh pdftotext (đường dẫn đầy đủ nếu không có trong PATH)
+        """
+        self.min_chars = min_chars
+        self.min_quality = min_quality
+        self.command = command
+        self.num_pages = 0
+
+    @staticmethod
+    def _is_valid_char(ch):
+        """Ký tự thường gặp trong văn bản tiếng Việt đúng mã Unicode"""
+        if ' ' <= ch <= '~' or ch in VIETNAMESE_LETTERS or ch in _EXTRA_CHARS:
+            return True
+        return unicodedata.category(ch) in ('Nd', 'Pd', 'Ps', 'Pe', 'Pi', 'Pf', 'Po')
+
+    def quality(self, text):
+        """
+        Đánh giá văn bản của một trang
+
+        Args:
+            text (str): Văn bản từ lớp văn bản
+
+        Returns:
+            tuple: (số ký tự không phải khoảng trắng, tỷ lệ ký tự hợp lệ)
+        """
+        chars = [ch for ch in text if not ch.isspace()]
+        if not chars:
+            return 0, 0.0
+        valid = sum(1 for ch in chars if self._is_valid_char(ch))
+        return len(chars), valid / len(chars)
+
+    def extract(self, pdf_path):
+        """
+        Đọc lớp văn bản của toàn bộ PDF bằng một lần gọi pdftotext
+
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+
+        Returns:
+            list: Văn bản từng trang theo thứ tự (None nếu không chạy được pdftotext)
+        """
+        try:
+            result = subprocess.run(
+                [self.command, '-enc', 'UTF-8', pdf_path, '-'],
+                capture_output=True, check=True
+            )
+        except FileNotFoundError:
+            logger.warning(f"⚠️  Không tìm thấy {self.command}, OCR toàn bộ các trang")
+            return None
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"⚠️  pdftotext lỗi ({e.stderr.decode('utf-8', 'replace').strip()}), "
+                           f"OCR toàn bộ các trang")
+            return None
+
+        # pdftotext kết thúc mỗi trang bằng ký tự form feed
+        pages = result.stdout.decode('utf-8', 'replace').split('\f')
+        if pages and not pages[-1].strip():
+            pages.pop()
+        return [unicodedata.normalize('NFC', page) for page in pages]
+
+    def probe(self, pdf_path):
+        """
+        Tìm các trang có lớp văn bản dùng được
+
+        Args:
+            pdf_path (str): Đường dẫn file PDF
+
+        Returns:
+            dict: {số trang: văn bản} cho các trang không cần OCR
+        """
+        pages = self.extract(pdf_path)
+        if pages is None:
+            self.num_pages = 0
+            return {}
+        self.num_pages = len(pages)
+
+        text_pages = {}
+        for number, text in enumerate(pages, start=1):
+            chars, quality = self.quality(text)
+            if chars >= self.min_chars and quality >= self.min_quality:
+                text_pages[number] = text.strip('\n')
+            elif chars >= self.min_chars:
+                logger.info(f"  Trang {number}: lớp văn bản không hợp lệ "
+                            f"({quality:.0%} ký tự hợp lệ), sẽ OCR")
+        logger.info(f"Lớp văn bản: {len(text_pages)}/{len(pages)} trang dùng được, "
+                    f"cần OCR {len(pages) - len(text_pages)} trang")
+        return text_pages
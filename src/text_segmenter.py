@@ -2,29 +2,148 @@
 Module phân đoạn văn bản thành các đơn vị nhỏ (câu hoặc đoạn)
 """
 import re
-import nltk
 from src.utils import setup_logging
 
 logger = setup_logging()
 
-# Download NLTK data nếu chưa có
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+# Từ viết tắt thường gặp (chữ thường, không kèm dấu chấm cuối): dấu chấm sau
+# các từ này không kết thúc câu ("TP. Hồ Chí Minh", "GS. Nguyễn Đức Dân")
+ABBREVIATIONS = frozenset("""
+    tp tt tx tr nxb gs pgs ts tskh ths bs ks cn ls nsnd nsưt mr mrs ms dr prof vd
+""".split())
+
+# Ứng viên ranh giới câu: cụm dấu kết thúc (kèm ngoặc/nháy đóng) trước khoảng trắng,
+# hoặc dòng trống giữa hai đoạn
+_BOUNDARY_REGEX = re.compile(r'([.!?;…]+)([”"’\'»)\]]*)(?=\s|$)|\n[ \t]*\n\s*')
+_PARAGRAPH_REGEX = re.compile(r'\n\s*\n+')
 
 class TextSegmenter:
-    def __init__(self, method='sentence', min_length=10):
+    def __init__(self, method='sentence', min_length=10, abbreviations=None):
         """
         Khởi tạo text segmenter
         
         Args:
             method (str): Phương pháp phân đoạn ('sentence' hoặc 'paragraph')
             min_length (int): Độ dài tối thiểu của một đoạn
+            abbreviations (list): Từ viết tắt bổ sung (ví dụ ["TW", "UBND"])
         """
         self.method = method
         self.min_length = min_length
+        self.abbreviations = ABBREVIATIONS
+        if abbreviations:
+            self.abbreviations = ABBREVIATIONS | {a.lower().rstrip('.') for a in abbreviations}
+    
+    @staticmethod
+    def _next_char(text, pos):
+        """Ký tự không phải khoảng trắng đầu tiên từ vị trí pos ('' nếu hết văn bản)"""
+        length = len(text)
+        while pos < length and text[pos].isspace():
+            pos += 1
+        return text[pos] if pos < length else ''
+    
+    def _is_sentence_end(self, text, match):
+        """
+        Kiểm tra cụm dấu câu có thực sự kết thúc câu hay không
+        
+        Args:
+            text (str): Văn bản
+            match (re.Match): Cụm dấu câu ứng viên
+            
+        Returns:
+            bool: True nếu là ranh giới câu
+        """
+        punct = match.group(1)
+        if punct[-1] in '!?;':
+            return True
+        
+        # Dấu chấm/chấm lửng mà câu sau bắt đầu bằng chữ thường là câu chưa kết thúc
+        # ("v.v. và", "... nhưng"), còn "v.v. Sau đó" vẫn là hai câu
+        next_char = self._next_char(text, match.end())
+        if next_char.islower():
+            return False
+        if punct != '.':
+            return True
+        
+        # Từ đứng ngay trước dấu chấm
+        pos = match.start(1)
+        word_start = pos
+        while word_start > 0 and not text[word_start - 1].isspace():
+            word_start -= 1
+        word = text[word_start:pos].lstrip('("“‘\'[')
+        if not word:
+            return True
+        if word.lower() in self.abbreviations:
+            return False
+        if len(word) == 1 and word.isupper():
+            return False  # Chữ viết tắt tên riêng: "Nguyễn V. A."
+        if word.isdigit() and (word_start == 0 or text[word_start - 1] == '\n'):
+            return False  # Số thứ tự đầu dòng: "1. Mở đầu"
+        return True
+    
+    def iter_sentence_spans(self, text):
+        """
+        Chia văn bản thành câu trong một lượt quét, giữ nguyên dấu câu
+        
+        Args:
+            text (str): Văn bản đầu vào
+            
+        Yields:
+            tuple: (start, end) vị trí ký tự của từng câu trong text (text[start:end] là câu)
+        """
+        start = 0
+        for match in _BOUNDARY_REGEX.finditer(text):
+            if match.group(1) is None:
+                end = match.start()  # Dòng trống giữa hai đoạn
+            elif self._is_sentence_end(text, match):
+                end = match.end()
+            else:
+                continue
+            yield from self._trimmed_span(text, start, end)
+            start = match.end()
+        yield from self._trimmed_span(text, start, len(text))
+    
+    def iter_paragraph_spans(self, text):
+        """
+        Chia văn bản thành các đoạn (ngăn cách bởi dòng trống)
         
+        Args:
+            text (str): Văn bản đầu vào
+            
+        Yields:
+            tuple: (start, end) vị trí ký tự của từng đoạn trong text
+        """
+        start = 0
+        for match in _PARAGRAPH_REGEX.finditer(text):
+            yield from self._trimmed_span(text, start, match.start())
+            start = match.end()
+        yield from self._trimmed_span(text, start, len(text))
+    
+    def _trimmed_span(self, text, start, end):
+        """Bỏ khoảng trắng hai đầu, trả về span nếu đủ độ dài tối thiểu"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end - start >= self.min_length:
+            yield start, end
+    
+    def iter_spans(self, text):
+        """
+        Chia văn bản theo phương pháp đã chọn, trả về vị trí thay vì bản sao chuỗi.
+        Dùng text[start:end] để lấy nội dung khi cần
+        
+        Args:
+            text (str): Văn bản đầu vào
+            
+        Yields:
+            tuple: (start, end) của từng đoạn
+        """
+        if self.method == 'paragraph':
+            return self.iter_paragraph_spans(text)
+        if self.method != 'sentence':
+            logger.warning(f"Phương pháp không hợp lệ: {self.method}. Sử dụng mặc định 'sentence'")
+        return self.iter_sentence_spans(text)
+    
     def segment_by_sentence(self, text):
         """
         Chia văn bản thành các câu
@@ -37,12 +156,7 @@ class TextSegmenter:
         """
         logger.info("Phân đoạn văn bản theo câu...")
         
-        # Sử dụng regex để chia câu theo dấu câu tiếng Việt
-        # Dấu kết thúc câu: . ! ? ; 
-        sentences = re.split(r'[.!?;]\s+', text)
-        
-        # Lọc câu quá ngắn
-        sentences = [s.strip() for s in sentences if len(s.strip()) >= self.min_length]
+        sentences = [text[start:end] for start, end in self.iter_sentence_spans(text)]
         
         logger.info(f"Đã chia thành {len(sentences)} câu")
         return sentences
@@ -59,11 +173,8 @@ class TextSegmenter:
         """
         logger.info("Phân đoạn văn bản theo đoạn...")
         
-        # Chia theo 2 newline trở lên
-        paragraphs = re.split(r'\n\s*\n+', text)
-        
-        # Lọc đoạn quá ngắn
-        paragraphs = [p.strip() for p in paragraphs if len(p.strip()) >= self.min_length]
+        # Chia theo 2 newline trở lên, bỏ đoạn quá ngắn
+        paragraphs = [text[start:end] for start, end in self.iter_paragraph_spans(text)]
         
         logger.info(f"Đã chia thành {len(paragraphs)} đoạn")
         return paragraphs
@@ -86,16 +197,21 @@ class TextSegmenter:
             logger.warning(f"Phương pháp không hợp lệ: {self.method}. Sử dụng mặc định 'sentence'")
             return self.segment_by_sentence(text)
     
-    def save_segments(self, segments, filepath):
+    def save_segments(self, segments, filepath, output_format='text', index_path=None):
         """
-        Lưu các đoạn văn bản ra file
+        Lưu các đoạn văn bản ra file (ghi theo khối qua SegmentWriter)
         
         Args:
-            segments (list): Danh sách các đoạn
+            segments (iterable): Các đoạn
             filepath (str): Đường dẫn file đích
+            output_format (str): 'text' hoặc 'jsonl'
+            index_path (str): File chỉ mục vị trí từng đoạn (None = không ghi)
+            
+        Returns:
+            int: Số đoạn đã lưu
         """
-        logger.info(f"Lưu {len(segments)} đoạn vào file: {filepath}")
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
+        from src.segment_writer import SegmentWriter
+        with SegmentWriter(filepath, output_format=output_format, index_path=index_path) as writer:
             for segment in segments:
-                f.write(segment + '\n')
\ No newline at end of file
+                writer.write(segment)
+        return writer.count
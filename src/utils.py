@@ -2,6 +2,8 @@
 Các hàm tiện ích chung
 """
 import os
+import re
+import json
 import yaml
 import logging
 
@@ -40,4 +42,31 @@ def save_text(text, filepath):
 def load_text(filepath):
     """Đọc văn bản từ file"""
     with open(filepath, 'r', encoding='utf-8') as f:
-        return f.read()
\ No newline at end of file
+        return f.read()
+
+def list_page_images(image_dir):
+    """
+    Liệt kê ảnh trang page_N.png theo đúng thứ tự số trang
+    (page_2 đứng trước page_10)
+    """
+    def page_number(filename):
+        match = re.search(r'(\d+)', filename)
+        return (int(match.group(1)) if match else 0, filename)
+    
+    return [
+        os.path.join(image_dir, f)
+        for f in sorted((f for f in os.listdir(image_dir) if f.endswith('.png')), key=page_number)
+    ]
+
+def save_pages(records, filepath):
+    """Lưu kết quả OCR theo trang ra file JSONL (mỗi dòng một trang)"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def load_pages(filepath):
+    """Đọc lần lượt từng trang từ file JSONL (generator, không nạp cả file)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)